@@ -0,0 +1,154 @@
+"""
+Time how long it takes to add and finalize a growing number of routes.
+
+    python benchmarks/finalize_scaling.py
+    python benchmarks/finalize_scaling.py --sizes 1000 10000 --backend radix
+    python benchmarks/finalize_scaling.py --sizes 10000 --report
+    python benchmarks/finalize_scaling.py --memory --layout nested
+
+Finalizing should grow (close to) linearly with the number of routes, so the
+time per route should stay roughly flat across the sizes.
+
+With --memory, finalize is traced to find the memory that it keeps (the tree
+and the compiled source) and the most that it holds beyond that while it
+runs. The latter is bounded by the split size and by the widest node of the
+tree, rather than by the number of routes: it stays flat for the nested
+layout, and only grows with the wide layout (all resources are siblings).
+Use --max-transient to fail when it goes over a number of megabytes.
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+from pathlib import Path
+from time import perf_counter
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sanic_routing import BaseRouter  # noqa: E402
+
+
+class Router(BaseRouter):
+    def get(self, path, method):
+        return self.resolve(path=path, method=method)
+
+
+def handler(**kwargs):
+    return kwargs
+
+
+def paths(count):
+    """
+    A mix of static, typed and nested routes, spread over resources of ten
+    routes each
+    """
+    templates = (
+        "/api/{k}",
+        "/api/{k}/<id:int>",
+        "/api/{k}/<id:int>/edit",
+        "/api/{k}/<id:int>/items/<item:uuid>",
+        "/api/{k}/<slug:slug>/about",
+        "/api/{k}/by-date/<day:ymd>",
+        "/api/{k}/files/<name:ext=png|jpg>",
+        "/{k}/<lang:en|fr|de>/<page>",
+        "/{k}/static/page",
+        "/{k}/<a>/<b>/<c:float>",
+    )
+    for idx in range(count):
+        yield templates[idx % len(templates)].format(
+            k=f"res{idx // len(templates)}"
+        )
+
+
+def nested_paths(count):
+    """
+    The same number of routes, spread over four levels of sixteen static
+    segments each, so that no node has more than sixteen children
+    """
+    for idx in range(count):
+        prefix = "/".join(
+            f"l{level}-{idx // 16**level % 16}" for level in range(4)
+        )
+        yield f"/{prefix}/r{idx // 16**4}/<id:int>/v{idx % 3}"
+
+
+LAYOUTS = {"wide": paths, "nested": nested_paths}
+
+
+def run(size, backend, layout="wide", report=False, memory=False):
+    router = Router()
+    start = perf_counter()
+    for path in LAYOUTS[layout](size):
+        router.add(path, handler, methods=["GET"])
+    added = perf_counter()
+    if memory:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+    router.finalize(backend=backend, report=report)
+    finalized = perf_counter()
+    traced = None
+    if memory:
+        kept, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        traced = (kept - before, peak - kept)
+    return added - start, finalized - added, router.finalize_report, traced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument(
+        "--backend",
+        default="tree",
+        choices=("tree", "match", "radix", "tiered"),
+    )
+    parser.add_argument("--layout", default="wide", choices=tuple(LAYOUTS))
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="trace the memory of finalize (which makes it much slower)",
+    )
+    parser.add_argument(
+        "--max-transient",
+        type=float,
+        help="fail if finalize holds more than this many MB beyond it keeps",
+    )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="print the time spent in each phase of finalize",
+    )
+    args = parser.parse_args()
+    memory = args.memory or args.max_transient is not None
+
+    header = f"{'routes':>8} {'add':>9} {'finalize':>9} {'us/route':>9}"
+    if memory:
+        header += f" {'kept':>9} {'transient':>10}"
+    print(header)
+    failed = False
+    for size in args.sizes:
+        add, finalize, report, traced = run(
+            size, args.backend, args.layout, args.report, memory
+        )
+        row = (
+            f"{size:>8} {add:>8.2f}s {finalize:>8.2f}s "
+            f"{finalize / size * 1e6:>9.1f}"
+        )
+        if traced:
+            kept, transient = (value / 1e6 for value in traced)
+            row += f" {kept:>7.1f}MB {transient:>8.1f}MB"
+            if args.max_transient is not None:
+                failed = failed or transient > args.max_transient
+        print(row)
+        if report:
+            print(f"\n{report}\n")
+    if failed:
+        sys.exit(f"finalize held more than {args.max_transient}MB")
+
+
+if __name__ == "__main__":
+    main()
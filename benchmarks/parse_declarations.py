@@ -0,0 +1,66 @@
+"""
+Time how long it takes to parse a corpus of route declarations.
+
+    python benchmarks/parse_declarations.py
+    python benchmarks/parse_declarations.py --count 50000
+
+Each declaration is split into its parts and normalized, and then built
+into a route with its params, which is the parsing that ``add()`` does.
+The caches are cleared before every run, and the best run is reported.
+"""
+
+import argparse
+import sys
+
+from pathlib import Path
+from time import perf_counter
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from finalize_scaling import Router, handler, paths  # noqa: E402
+
+from sanic_routing import route, utils  # noqa: E402
+
+
+def clear_caches():
+    for module in (route, utils):
+        for value in vars(module).values():
+            if hasattr(value, "cache_clear"):
+                value.cache_clear()
+
+
+def best(runs, func):
+    timings = []
+    for _ in range(runs):
+        clear_caches()
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    router = Router()
+    declarations = list(paths(args.count))
+
+    def split():
+        for path in declarations:
+            utils.parts_to_path(utils.path_to_parts(path))
+
+    def build():
+        for path in declarations:
+            route.Route(router, path.lstrip("/"), "", handler, ["GET"])
+
+    print(f"{args.count} declarations")
+    print(f"  split and normalize: {best(args.runs, split):.3f}s")
+    print(f"  build routes:        {best(args.runs, build):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 from .group import RouteGroup
+from .profile import RouteProfile
+from .report import FinalizeReport
 from .route import Route
 from .router import BaseRouter
 
 
 __version__ = "23.12.0"
-__all__ = ("BaseRouter", "Route", "RouteGroup")
+__all__ = (
+    "BaseRouter",
+    "FinalizeReport",
+    "Route",
+    "RouteGroup",
+    "RouteProfile",
+)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import FrozenSet, List, Optional, Sequence, Tuple
+from operator import attrgetter
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 from sanic_routing.route import Requirements, Route
 from sanic_routing.utils import Immutable
@@ -67,6 +68,10 @@ class RouteGroup:
         route_list.pop()
 
         self._routes = routes
+        self._index: Optional[Dict[Any, List[Route]]] = None
+        self._descending = all(
+            a.priority >= b.priority for a, b in zip(routes, routes[1:])
+        )
         self.pattern_idx = 0
 
     def __str__(self):
@@ -84,6 +89,14 @@ class RouteGroup:
     def __getitem__(self, key):
         return self.routes[key]
 
+    def __copy__(self) -> RouteGroup:
+        group = self.__class__.__new__(self.__class__)
+        group.__dict__.update(self.__dict__)
+        # The index is updated in place as routes are added, so the copy
+        # builds one of its own
+        group._index = None
+        return group
+
     def __getattr__(self, key):
         # There are a number of properties that all of the routes in the group
         # share in common. We pass thrm through to make them available
@@ -111,6 +124,7 @@ class RouteGroup:
         self._routes = tuple(
             sorted(self._routes, key=lambda route: route.priority)
         )
+        self._descending = False
 
     def reset(self):
         self.methods_index = dict(self.methods_index)
@@ -152,29 +166,162 @@ class RouteGroup:
         """
         _routes = list(self._routes)
         for other_route in group.routes:
-            for current_route in self:
-                if (
-                    current_route == other_route
-                    or (
-                        current_route.requirements
-                        and not other_route.requirements
-                    )
-                    or (
-                        not current_route.requirements
-                        and other_route.requirements
+            # The route is added once for every route in this group that it
+            # does not conflict with
+            if append:
+                count = len(self._routes)
+            else:
+                conflicts = self._conflicts(other_route)
+                if conflicts and not overwrite:
+                    raise RouteExists(
+                        f"Route already registered: {self.raw_path} "
+                        f"[{','.join(self.methods)}]"
                     )
-                ) and not append:
-                    if not overwrite:
-                        raise RouteExists(
-                            f"Route already registered: {self.raw_path} "
-                            f"[{','.join(self.methods)}]"
-                        )
+                count = len(self._routes) - len(conflicts)
+            _routes.extend([other_route] * count)
+
+        descending = self._descending
+        if len(_routes) > len(self._routes):
+            _routes.sort(key=attrgetter("priority"), reverse=True)
+            descending = True
+        self._set_routes(_routes)
+        self._descending = descending
+
+    def add_route(
+        self, route: Route, overwrite: bool = False, append: bool = False
+    ) -> None:
+        """
+        Add a single route to the group. The result is the same as merging
+        this group into a new group of the route (see :py:meth:`merge`), but
+        the conflicting routes are looked up in an index of the group, and
+        the group is updated in place. Adding many routes to one group (for
+        example with ``append``) therefore does not compare every new route
+        against every route that is already in it.
+
+        :param route: Incoming route
+        :type route: Route
+        :param overwrite: whether to replace the routes that it conflicts
+            with, defaults to False
+        :type overwrite: bool, optional
+        :param append: whether to add the route regardless of conflicts,
+            defaults to False
+        :type append: bool, optional
+        :raises RouteExists: Raised when there is a duplicate
+        """
+        routes = list(self._routes)
+        if not append:
+            conflicts = self._conflicts(route)
+            if conflicts and not overwrite:
+                raise RouteExists(
+                    f"Route already registered: {route.raw_path} "
+                    f"[{','.join(route.methods)}]"
+                )
+            if conflicts:
+                routes = [r for r in routes if id(r) not in conflicts]
+                self._index = None
+
+        if self._descending:
+            # The route goes in front of any routes with the same priority,
+            # which is where a stable sort would put it
+            low, high = 0, len(routes)
+            while low < high:
+                mid = (low + high) // 2
+                if routes[mid].priority > route.priority:
+                    low = mid + 1
                 else:
-                    _routes.append(other_route)
-                    _routes.sort(
-                        key=lambda route: route.priority, reverse=True
-                    )
-        self._routes = tuple(_routes)
+                    high = mid
+            routes.insert(low, route)
+        else:
+            routes.insert(0, route)
+            routes.sort(key=attrgetter("priority"), reverse=True)
+        index = self._index
+        self._set_routes(routes)
+        self._descending = True
+        if index is not None:
+            self._index = index
+            self._add_to_index(index, route)
+
+    def remove_route(self, route: Route) -> None:
+        """
+        Remove a single route from the group. The group is left empty if it
+        was the only route in it.
+
+        :param route: The route to remove (the same instance that was added)
+        :type route: Route
+        :raises InvalidUsage: The route is not in the group
+        """
+        routes = [r for r in self._routes if r is not route]
+        if len(routes) == len(self._routes):
+            raise InvalidUsage(f"Route is not in the group: {route.raw_path}")
+        self._set_routes(routes)
+
+    def _set_routes(self, routes: List[Route]) -> None:
+        self._routes = tuple(routes)
+        self._index = None
+        # The properties that are passed through are cached from the first
+        # route, which may have changed
+        for key in self.passthru_properties:
+            self.__dict__.pop(key, None)
+
+    def _conflicts(self, route: Route) -> Dict[int, Route]:
+        """
+        The routes in the group that the route conflicts with (by id). A
+        route conflicts with any route that has the same requirements and
+        shares a method with it. It also conflicts with every route where
+        only one of the two has requirements.
+        """
+        if self._index is None:
+            self._index = {}
+            for existing in self._routes:
+                self._add_to_index(self._index, existing)
+
+        key = self._requirements_key(route)
+        if key is None:
+            # Requirements that cannot be hashed are not indexed, and are
+            # compared with every route instead
+            found = {
+                id(existing): existing
+                for existing in self._routes
+                if self._same_requirements(existing, route)
+            }
+        else:
+            found = {
+                id(existing): existing
+                for method in route.methods
+                for existing in self._index.get((key, method), ())
+            }
+            for existing in self._index.get(None, ()):
+                if self._same_requirements(existing, route):
+                    found[id(existing)] = existing
+        for existing in self._index.get(not route.requirements, ()):
+            found[id(existing)] = existing
+        return found
+
+    @staticmethod
+    def _requirements_key(route: Route) -> Optional[FrozenSet[Any]]:
+        try:
+            return frozenset(route.requirements.items())
+        except TypeError:
+            return None
+
+    @staticmethod
+    def _same_requirements(existing: Route, route: Route) -> bool:
+        return bool(existing.methods & route.methods) and (
+            existing.requirements == route.requirements
+        )
+
+    @classmethod
+    def _add_to_index(
+        cls, index: Dict[Any, List[Route]], route: Route
+    ) -> None:
+        key = cls._requirements_key(route)
+        if key is None:
+            index.setdefault(None, []).append(route)
+        else:
+            for method in route.methods:
+                index.setdefault((key, method), []).append(route)
+        # Also index on whether it has requirements at all
+        index.setdefault(bool(route.requirements), []).append(route)
 
     @property
     def depth(self) -> int:
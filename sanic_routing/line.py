@@ -1,3 +1,6 @@
+import typing as t
+
+
 class Line:
     TAB = "    "
 
@@ -15,3 +18,10 @@ class Line:
 
     def __str__(self):
         return (self.TAB * self.indent) + self.src + "\n"
+
+
+def to_source(lines: t.Iterable[Line]) -> str:
+    """
+    Render lines into source, skipping the ones that are not rendered
+    """
+    return "".join(str(line) for line in lines if line.render)
@@ -0,0 +1,454 @@
+"""
+Optimizations for the AST of the generated ``find_route`` source. They are
+applied when the router is finalized with ``do_optimize=True``.
+
+The passes rely upon a few properties of the generated source: ``num`` is
+the length of ``parts``, neither of them change once they are assigned, and
+the conditions of the ``if`` blocks do not have side effects.
+"""
+
+import ast
+import sys
+import typing as t
+
+
+Bounds = t.Tuple[int, t.Optional[int]]
+
+UNBOUNDED: Bounds = (0, None)
+NEGATED = {
+    ast.Gt: ast.Lt,
+    ast.Lt: ast.Gt,
+    ast.Eq: ast.NotEq,
+    ast.NotEq: ast.Eq,
+}
+NEGATED_OFFSET = {ast.Gt: 1, ast.Lt: -1}
+FLIPPED = {
+    ast.Gt: ast.Lt,
+    ast.GtE: ast.LtE,
+    ast.Lt: ast.Gt,
+    ast.LtE: ast.GtE,
+    ast.Eq: ast.Eq,
+    ast.NotEq: ast.NotEq,
+}
+PURE: t.Tuple[t.Type[ast.AST], ...] = (
+    ast.Attribute,
+    ast.BoolOp,
+    ast.Compare,
+    ast.Constant,
+    ast.Dict,
+    ast.Name,
+    ast.Set,
+    ast.Subscript,
+    ast.Tuple,
+    ast.UnaryOp,
+    ast.boolop,
+    ast.cmpop,
+    ast.expr_context,
+    ast.unaryop,
+)
+if sys.version_info < (3, 9):
+    PURE += (ast.Index,)
+if sys.version_info < (3, 8):
+    PURE += (ast.NameConstant, ast.Num, ast.Str)
+TERMINAL = (ast.Break, ast.Continue, ast.Raise, ast.Return)
+BLOCKS = ("body", "orelse", "finalbody")
+
+
+def optimize(module: ast.Module) -> ast.Module:
+    """
+    Optimize every function in the module of the generated source:
+
+    - Remove length checks (``num``) that are already known to pass, and
+      the branches that can never be reached
+    - Merge successive ``if`` blocks that have identical conditions
+    - Hoist ``parts[idx]`` into a local when it is used more than once
+    - Concatenate nested single ``if`` blocks into a single condition
+    """
+    for node in module.body:
+        if isinstance(node, ast.FunctionDef):
+            bounded = _is_bounded(node)
+            if bounded:
+                node.body = _simplify(node.body, UNBOUNDED)
+            node.body = _merge(node.body)
+            if bounded:
+                node.body = _hoist(node.body, UNBOUNDED, set())
+            node.body = _concatenate(node.body)
+    return ast.fix_missing_locations(module)
+
+
+def _is_bounded(func: ast.FunctionDef) -> bool:
+    """
+    Whether the length checks of the function can be tracked, which is only
+    possible when ``num`` is not assigned inside of any block
+    """
+    top = [
+        stmt
+        for stmt in func.body
+        if isinstance(stmt, ast.Assign) and _stores([stmt], {"num"})
+    ]
+    nested = [
+        node
+        for stmt in func.body
+        if stmt not in top
+        for node in ast.walk(stmt)
+        if isinstance(node, ast.Name)
+        and node.id == "num"
+        and isinstance(node.ctx, ast.Store)
+    ]
+    return len(top) <= 1 and not nested
+
+
+def _constant(node: ast.AST) -> t.Any:
+    if sys.version_info < (3, 8) and isinstance(node, ast.Num):
+        return node.n
+    if isinstance(node, ast.Constant):
+        return node.value
+    return None
+
+
+def _length_check(test: ast.AST) -> t.Optional[t.Tuple[t.Type, int]]:
+    """
+    Normalize a condition like ``num > 3`` or ``3 < num`` into ``(Gt, 3)``
+    """
+    if (
+        not isinstance(test, ast.Compare)
+        or len(test.ops) != 1
+        or type(test.ops[0]) not in FLIPPED
+    ):
+        return None
+
+    op = type(test.ops[0])
+    left, right = test.left, test.comparators[0]
+    if isinstance(right, ast.Name):
+        left, right = right, left
+        op = FLIPPED[op]
+
+    value = _constant(right)
+    if (
+        isinstance(left, ast.Name)
+        and left.id == "num"
+        and isinstance(value, int)
+        and not isinstance(value, bool)
+    ):
+        if op is ast.GtE:
+            return ast.Gt, value - 1
+        if op is ast.LtE:
+            return ast.Lt, value + 1
+        return op, value
+    return None
+
+
+def _narrow(
+    bounds: Bounds, check: t.Tuple[t.Type, int], truth: bool
+) -> Bounds:
+    op, value = check
+    if not truth:
+        op, value = NEGATED[op], value + NEGATED_OFFSET.get(op, 0)
+
+    low, high = bounds
+    if op is ast.Gt:
+        low = max(low, value + 1)
+    elif op is ast.Lt:
+        high = value - 1 if high is None else min(high, value - 1)
+    elif op is ast.Eq:
+        low = max(low, value)
+        high = value if high is None else min(high, value)
+    elif op is ast.NotEq:
+        if low == value:
+            low += 1
+        if high == value:
+            high -= 1
+    return low, high
+
+
+def _is_empty(bounds: Bounds) -> bool:
+    low, high = bounds
+    return high is not None and low > high
+
+
+def _canonical(check: t.Tuple[t.Type, int]) -> ast.Compare:
+    op, value = check
+    return ast.Compare(
+        left=ast.Name(id="num", ctx=ast.Load()),
+        ops=[op()],
+        comparators=[ast.Constant(value=value)],
+    )
+
+
+def _simplify_test(
+    test: ast.expr, bounds: Bounds
+) -> t.Tuple[t.Union[ast.expr, bool], Bounds, Bounds]:
+    """
+    Evaluate a condition against what is known about ``num``. Returns the
+    simplified condition (or ``True``/``False`` when it is known ahead of
+    time), and what is known about ``num`` when it passes and when it fails.
+    """
+    check = _length_check(test)
+    if check:
+        passed = _narrow(bounds, check, True)
+        failed = _narrow(bounds, check, False)
+        if _is_empty(failed):
+            return True, bounds, bounds
+        if _is_empty(passed):
+            return False, bounds, bounds
+        return _canonical(check), passed, failed
+
+    if isinstance(test, ast.BoolOp) and isinstance(test.op, ast.And):
+        values: t.List[ast.expr] = []
+        passed = bounds
+        for value in test.values:
+            simplified, narrowed, _ = _simplify_test(value, passed)
+            if simplified is False:
+                if all(map(_is_pure, values)):
+                    return False, bounds, bounds
+                values.append(value)
+            elif simplified is not True:
+                values.append(t.cast(ast.expr, simplified))
+                passed = narrowed
+        if not values:
+            return True, bounds, bounds
+        if len(values) == 1:
+            return _simplify_test(values[0], bounds)
+        return ast.BoolOp(op=ast.And(), values=values), passed, bounds
+
+    return test, bounds, bounds
+
+
+def _simplify(stmts: t.List[ast.stmt], bounds: Bounds) -> t.List[ast.stmt]:
+    """
+    Remove the length checks that are known to pass, the branches that
+    cannot be reached, and anything that follows a return or raise
+    """
+    result: t.List[ast.stmt] = []
+    for stmt in stmts:
+        if isinstance(stmt, ast.If):
+            test, passed, failed = _simplify_test(stmt.test, bounds)
+            if test is True:
+                result.extend(_simplify(stmt.body, bounds))
+            elif test is False:
+                result.extend(_simplify(stmt.orelse, bounds))
+            else:
+                stmt.test = t.cast(ast.expr, test)
+                stmt.body = _simplify(stmt.body, passed)
+                stmt.orelse = _simplify(stmt.orelse, failed)
+                if stmt.body or stmt.orelse or not _is_pure(stmt.test):
+                    stmt.body = stmt.body or [ast.Pass()]
+                    result.append(stmt)
+        else:
+            _visit_blocks(stmt, lambda block: _simplify(block, bounds))
+            result.append(stmt)
+
+        if result and isinstance(result[-1], TERMINAL):
+            break
+    return result
+
+
+def _merge(stmts: t.List[ast.stmt]) -> t.List[ast.stmt]:
+    """
+    Merge successive if blocks with identical conditions
+
+    EXAMPLE:
+          if num == 5:
+              foo1()
+          if num == 5:
+              foo2()
+    BECOMES:
+          if num == 5:
+              foo1()
+              foo2()
+    """
+    for stmt in stmts:
+        _visit_blocks(stmt, _merge)
+    return _merge_level(stmts)
+
+
+def _merge_level(stmts: t.List[ast.stmt]) -> t.List[ast.stmt]:
+    merged: t.List[ast.stmt] = []
+    for stmt in stmts:
+        previous = merged[-1] if merged else None
+        if (
+            isinstance(stmt, ast.If)
+            and isinstance(previous, ast.If)
+            and not previous.orelse
+            and _is_pure(stmt.test)
+            and ast.dump(previous.test) == ast.dump(stmt.test)
+            and not _stores(previous.body, _names(stmt.test))
+        ):
+            previous.body = _merge_level(previous.body + stmt.body)
+            previous.orelse = stmt.orelse
+        else:
+            merged.append(stmt)
+    return merged
+
+
+def _hoist(
+    stmts: t.List[ast.stmt], bounds: Bounds, hoisted: t.Set[int]
+) -> t.List[ast.stmt]:
+    """
+    Read a path segment once into a local when it is used more than once in
+    a block where it is known to exist
+
+    EXAMPLE:
+          if num > 2:
+              if parts[2] == "foo":
+                  ...
+              if parts[2] == "bar":
+                  ...
+    BECOMES:
+          if num > 2:
+              part_2 = parts[2]
+              if part_2 == "foo":
+                  ...
+              if part_2 == "bar":
+                  ...
+    """
+    counts: t.Dict[int, int] = {}
+    for stmt in stmts:
+        for node in ast.walk(stmt):
+            idx = _part_idx(node)
+            if idx is not None:
+                counts[idx] = counts.get(idx, 0) + 1
+
+    hoist = {
+        idx
+        for idx, count in counts.items()
+        if count > 1 and idx < bounds[0] and idx not in hoisted
+    }
+    if hoist:
+        replacer = _PartReplacer(hoist)
+        stmts = [replacer.visit(stmt) for stmt in stmts]
+        stmts = [
+            ast.Assign(
+                targets=[ast.Name(id=f"part_{idx}", ctx=ast.Store())],
+                value=ast.Subscript(
+                    value=ast.Name(id="parts", ctx=ast.Load()),
+                    slice=_index(idx),
+                    ctx=ast.Load(),
+                ),
+            )
+            for idx in sorted(hoist)
+        ] + stmts
+        hoisted = hoisted | hoist
+
+    for stmt in stmts:
+        if isinstance(stmt, ast.If):
+            _, passed, failed = _simplify_test(stmt.test, bounds)
+            stmt.body = _hoist(stmt.body, passed, hoisted)
+            stmt.orelse = _hoist(stmt.orelse, failed, hoisted)
+        else:
+            _visit_blocks(stmt, lambda block: _hoist(block, bounds, hoisted))
+    return stmts
+
+
+def _concatenate(stmts: t.List[ast.stmt]) -> t.List[ast.stmt]:
+    """
+    Concatenate nested single if blocks
+
+    EXAMPLE:
+          if parts[1] == "foo":
+              if num > 3:
+    BECOMES:
+          if parts[1] == 'foo' and num > 3:
+    """
+    for stmt in stmts:
+        _visit_blocks(stmt, _concatenate)
+        while (
+            isinstance(stmt, ast.If)
+            and not stmt.orelse
+            and len(stmt.body) == 1
+            and isinstance(stmt.body[0], ast.If)
+            and not stmt.body[0].orelse
+        ):
+            nested = stmt.body[0]
+            values: t.List[ast.expr] = []
+            for test in (stmt.test, nested.test):
+                if isinstance(test, ast.BoolOp) and isinstance(
+                    test.op, ast.And
+                ):
+                    values.extend(test.values)
+                else:
+                    values.append(test)
+            stmt.test = ast.BoolOp(op=ast.And(), values=values)
+            stmt.body = nested.body
+    return stmts
+
+
+def _visit_blocks(
+    stmt: ast.stmt,
+    visit: t.Callable[[t.List[ast.stmt]], t.List[ast.stmt]],
+) -> None:
+    for field in BLOCKS:
+        block = getattr(stmt, field, None)
+        if block:
+            setattr(stmt, field, visit(block) or [ast.Pass()])
+    for handler in getattr(stmt, "handlers", ()):
+        handler.body = visit(handler.body) or [ast.Pass()]
+
+
+def _is_pure(node: ast.AST) -> bool:
+    return all(isinstance(child, PURE) for child in ast.walk(node))
+
+
+def _names(node: ast.AST) -> t.Set[str]:
+    return {
+        child.id for child in ast.walk(node) if isinstance(child, ast.Name)
+    }
+
+
+def _stores(stmts: t.List[ast.stmt], names: t.Set[str]) -> bool:
+    """
+    Whether any of the statements assign to any of the names, or may mutate
+    them by assigning to (or calling a method on) one of their attributes
+    """
+    for stmt in stmts:
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Call):
+                target = node.func
+            elif isinstance(getattr(node, "ctx", None), (ast.Store, ast.Del)):
+                target = node
+            else:
+                continue
+            while isinstance(target, (ast.Attribute, ast.Subscript)):
+                target = target.value
+            if isinstance(target, ast.Name) and target.id in names:
+                return True
+    return False
+
+
+def _index(idx: int) -> t.Any:
+    if sys.version_info < (3, 9):
+        return ast.Index(value=ast.Constant(value=idx))
+    return ast.Constant(value=idx)
+
+
+def _part_idx(node: ast.AST) -> t.Optional[int]:
+    """
+    The index of a ``parts[idx]`` read, if that is what the node is
+    """
+    if not (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.ctx, ast.Load)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "parts"
+    ):
+        return None
+    slice_ = node.slice
+    if sys.version_info < (3, 9) and isinstance(slice_, ast.Index):
+        slice_ = slice_.value  # type: ignore
+    idx = _constant(slice_)
+    if isinstance(idx, int) and not isinstance(idx, bool) and idx >= 0:
+        return idx
+    return None
+
+
+class _PartReplacer(ast.NodeTransformer):
+    def __init__(self, hoist: t.Set[int]) -> None:
+        self.hoist = hoist
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        idx = _part_idx(node)
+        if idx in self.hoist:
+            return ast.copy_location(
+                ast.Name(id=f"part_{idx}", ctx=ast.Load()), node
+            )
+        return self.generic_visit(node)
@@ -5,8 +5,9 @@ import uuid
 from datetime import date, datetime
 from types import SimpleNamespace
 from typing import Any, Callable, Dict, Pattern, Tuple, Type
+from urllib.parse import unquote
 
-from sanic_routing.exceptions import InvalidUsage, NotFound
+from sanic_routing.exceptions import InvalidUsage
 
 
 def parse_date(d) -> date:
@@ -32,6 +33,71 @@ def ext(param: str) -> Tuple[str, ...]:
     return parts
 
 
+def split_ext(param: str, sub_count: int = 0) -> Tuple[str, str]:
+    """
+    Split a filename into its name and extension, where the extension is
+    made up of ``sub_count + 1`` dot separated parts. This applies the same
+    filename rules as :func:`ext` without exploding the whole value.
+    """
+    if (
+        "." not in param
+        or param.startswith(".")
+        or param.endswith(".")
+        or ".." in param
+    ):
+        raise ValueError(f"Value {param} does not match filename format")
+    idx = len(param)
+    for _ in range(sub_count + 1):
+        idx = param.rfind(".", 0, idx)
+        if idx == -1:
+            return "", param
+    return param[:idx], param[idx + 1 :]
+
+
+def cast_segment(
+    matches: Dict[int, Any],
+    idx: int,
+    cast: Callable[[str], Any],
+    param: str,
+    unquote_value: bool = False,
+) -> bool:
+    """
+    Cast a path segment into the matches, and whether it could be cast. This
+    allows casting inside of the guard of a ``case`` clause.
+    """
+    try:
+        value = cast(param)
+    except ValueError:
+        return False
+    matches[idx] = unquote(value) if unquote_value else value
+    return True
+
+
+def ext_segment(
+    matches: Dict[int, Any],
+    idx: int,
+    param: str,
+    sub_count: int,
+    allowed: t.Optional[t.AbstractSet[str]],
+    cast: t.Optional[Callable[[str], Any]],
+    unquote_value: bool = False,
+) -> bool:
+    """
+    Split a filename segment into the matches, and whether its format,
+    extension and filename type are valid
+    """
+    try:
+        filename, extension = split_ext(param, sub_count)
+        if allowed is not None and extension not in allowed:
+            return False
+        if unquote_value:
+            filename = unquote(filename)
+        matches[idx] = (cast(filename) if cast else filename, extension)
+    except ValueError:
+        return False
+    return True
+
+
 def nonemptystr(param: str) -> str:
     if not param:
         raise ValueError(f"Value {param} is an empty string")
@@ -69,6 +135,14 @@ class ParamInfo:
         self.priority = priority
         self.ctx = SimpleNamespace()
 
+    @property
+    def key(self) -> str:
+        """
+        The value that identifies the param when routing. Params with the
+        same key match exactly the same segments.
+        """
+        return self.label
+
     def process(
         self,
         params: t.Dict[str, t.Any],
@@ -77,10 +151,23 @@ class ParamInfo:
         params[self.name] = value
 
 
+class AlternationParamInfo(ParamInfo):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ctx.allowed = frozenset(self.label.split("|"))
+
+
 class ExtParamInfo(ParamInfo):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        match = REGEX_PARAM_EXT_PATH.search(self.raw_path)
+        match = next(
+            (
+                match
+                for match in REGEX_PARAM_EXT_PATH.finditer(self.raw_path)
+                if match.group(1) == self.name
+            ),
+            None,
+        )
         if not match:
             raise InvalidUsage(
                 f"Invalid extension parameter definition: {self.raw_path}"
@@ -93,6 +180,7 @@ class ExtParamInfo(ParamInfo):
         ext_type = match.group(3)
         regex_type = REGEX_TYPES.get(match.group(2))
         self.ctx.cast = None
+        self.ctx.cast_label = match.group(2)
         if regex_type:
             self.ctx.cast = regex_type[0]
         elif match.group(2):
@@ -118,19 +206,19 @@ class ExtParamInfo(ParamInfo):
                 if not REGEX_ALLOWED_EXTENSION.match(extension):
                     raise InvalidUsage(f"Invalid extension: {extension}")
 
+    @property
+    def key(self) -> str:
+        key = self.label
+        if self.ctx.cast_label:
+            key += f"[{self.ctx.cast_label}]"
+        if self.ctx.allowed:
+            key += "=" + "|".join(sorted(self.ctx.allowed))
+        return key
+
     def process(self, params, value):
-        stop = -1 * (self.ctx.allowed_sub_count + 1)
-        filename = ".".join(value[:stop])
-        ext = ".".join(value[stop:])
-        if self.ctx.allowed and ext not in self.ctx.allowed:
-            raise NotFound(f"Invalid extension: {ext}")
-        if self.ctx.cast:
-            try:
-                filename = self.ctx.cast(filename)
-            except ValueError:
-                raise NotFound(f"Invalid filename: {filename}")
-        params[self.name] = filename
-        params["ext"] = ext
+        # The filename and extension have already been validated, and the
+        # filename cast, while matching in the tree
+        params[self.name], params["ext"] = value
 
 
 EXTENSION = r"[a-z0-9](?:[a-z0-9\.]*[a-z0-9])?"
@@ -141,6 +229,9 @@ REGEX_PARAM_NAME = re.compile(r"^<([a-zA-Z_][a-zA-Z0-9_]*)(?::(.*))?>$")
 REGEX_PARAM_EXT_PATH = re.compile(PARAM_EXT)
 REGEX_PARAM_NAME_EXT = re.compile(r"^" + PARAM_EXT + r"$")
 REGEX_ALLOWED_EXTENSION = re.compile(r"^" + EXTENSION + r"$")
+# A pattern that is nothing more than an alternation of literals
+# (eg. <lang:en|fr|de>) does not require regex evaluation
+REGEX_ALTERNATION = re.compile(r"^[a-zA-Z0-9_~-]+(?:\|[a-zA-Z0-9_~-]+)+$")
 
 # Predefined path parameter types. The value is a tuple consisteing of a
 # callable and a compiled regular expression.
@@ -176,3 +267,18 @@ REGEX_TYPES: REGEX_TYPES_ANNOTATION = {
         ParamInfo,
     ),
 }
+
+# A value of each of the predefined types, used to generate concrete paths
+# for routes (for example to warm up the router)
+REGEX_SAMPLES: Dict[str, str] = {
+    "strorempty": "a",
+    "str": "a",
+    "ext": "a.txt",
+    "slug": "a-b",
+    "alpha": "a",
+    "path": "a/b",
+    "float": "1.0",
+    "int": "1",
+    "ymd": "2000-01-01",
+    "uuid": "00000000-0000-4000-8000-000000000000",
+}
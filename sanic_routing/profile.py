@@ -0,0 +1,47 @@
+"""
+Record how often each route is resolved, so that the router can be finalized
+with the most popular branches of the tree tried first.
+"""
+
+import json
+import typing as t
+
+from collections import Counter
+from os import PathLike
+
+from .route import Route
+
+
+class RouteProfile:
+    """
+    The number of times each route (by its path) has been resolved. Attach
+    one to ``router.profile`` to record hits, save it, and pass it back to
+    ``finalize`` the next time the router is built.
+    """
+
+    def __init__(self, hits: t.Optional[t.Dict[str, int]] = None) -> None:
+        self.hits: t.Counter[str] = Counter(hits or {})
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+    def __bool__(self) -> bool:
+        return bool(self.hits)
+
+    def record(self, route: Route) -> None:
+        self.hits[route.path] += 1
+
+    def weight(self, path: str) -> int:
+        return self.hits.get(path, 0)
+
+    def merge(self, other: "RouteProfile") -> None:
+        self.hits.update(other.hits)
+
+    def save(self, filename: t.Union[str, PathLike]) -> None:
+        with open(filename, "w") as f:
+            json.dump({"hits": dict(self.hits)}, f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, filename: t.Union[str, PathLike]) -> "RouteProfile":
+        with open(filename) as f:
+            return cls(json.load(f).get("hits"))
@@ -0,0 +1,274 @@
+"""
+A matching engine that walks a compressed radix tree at runtime, instead of
+generating and compiling source for the tree. It is used when the router is
+finalized with ``backend="radix"``.
+"""
+
+import re
+import typing as t
+
+from .exceptions import NoMethod, NotFound
+from .group import RouteGroup
+from .patterns import (
+    AlternationParamInfo,
+    ExtParamInfo,
+    ParamInfo,
+    cast_segment,
+    ext_segment,
+)
+from .tree import Node
+
+
+Matcher = t.Callable[[t.Dict[int, t.Any], int, str], bool]
+
+
+class RadixNode:
+    """
+    A node of the radix tree. Runs of static nodes that only lead to one
+    another are compressed into a single node, with the segments after the
+    first one held in its ``prefix``.
+
+    The children are held in ``entries``, in the same order that the
+    generated source would try them. Successive static children are held in
+    a single dict since only one of them can ever match a segment. Dynamic
+    children are held with the matcher that casts their segment.
+    """
+
+    __slots__ = ("entries", "leaf", "level", "min_num", "prefix")
+
+    def __init__(self, level: int, leaf: bool) -> None:
+        self.level = level
+        self.min_num = level if leaf else level + 1
+        self.prefix: t.Tuple[str, ...] = ()
+        self.entries: t.List[t.Any] = []
+        self.leaf: t.Optional[Leaf] = None
+
+
+class Leaf:
+    """
+    The route selection for the groups that terminate on a node. This
+    mirrors the source that ``Node._inject_groups`` would generate: only
+    the first group (in order of priority) is ever returned.
+    """
+
+    __slots__ = ("group", "route", "stacking")
+
+    def __init__(self, groups: t.List[RouteGroup], stacking: bool) -> None:
+        self.group = groups[0]
+        self.stacking = stacking
+        self.route: t.Any = None
+        if not self.group.requirements and len(self.group.routes) == 1:
+            self.route = self.group if stacking else self.group[0]
+
+    def select(self, method, extra):
+        if self.route is not None:
+            return self.route
+
+        group = self.group
+        route_idx: t.Optional[int] = None
+        if group.requirements:
+            for k, route in enumerate(group):
+                if extra == route.requirements and method in route.methods:
+                    route_idx = k
+                    break
+            else:
+                raise NotFound
+        else:
+            for i, route in enumerate(group.routes):
+                if method in route.methods:
+                    route_idx = i
+                    break
+            else:
+                raise NoMethod
+        return group if self.stacking else group[route_idx]
+
+
+class RadixTree:
+    def __init__(self, router) -> None:
+        self.router = router
+        self.root = RadixNode(0, False)
+        self.path_groups: t.List[t.Tuple[t.Pattern, Leaf]] = []
+
+    def build(
+        self, tree_root: Node, path_groups: t.Iterable[RouteGroup]
+    ) -> None:
+        """
+        Build the radix tree from the (finalized) nodes of the ``Tree``, and
+        keep the groups that need to be matched against the whole path
+        """
+        self.root = self._build(tree_root, RadixNode(0, False))
+        self._build_paths(path_groups)
+
+    def _build_paths(self, path_groups: t.Iterable[RouteGroup]) -> None:
+        self.path_groups = [
+            (
+                re.compile(f"^{group.pattern}$"),
+                Leaf([group], self.router.stacking),
+            )
+            for group in path_groups
+        ]
+
+    def _build(self, node: Node, radix: RadixNode) -> RadixNode:
+        if node.groups:
+            radix.leaf = Leaf(
+                sorted(node.groups, key=node._group_sorting),
+                self.router.stacking,
+            )
+
+        static: t.Optional[t.Dict[str, RadixNode]] = None
+        for child in node.children.values():
+            if child.dynamic:
+                static = None
+                radix.entries.append(
+                    (
+                        self._matcher(child),
+                        self._build(
+                            child, RadixNode(child.level, bool(child.groups))
+                        ),
+                    )
+                )
+                continue
+
+            if static is None:
+                static = {}
+                radix.entries.append(static)
+            static[child.part] = self._build_static(child)
+        return radix
+
+    def _build_static(self, node: Node) -> RadixNode:
+        """
+        Build a static node, compressing it with any static nodes that it
+        only leads to
+        """
+        prefix: t.List[str] = []
+        while (
+            not node.groups
+            and len(node.children) == 1
+            and not next(iter(node.children.values())).dynamic
+        ):
+            node = next(iter(node.children.values()))
+            prefix.append(node.part)
+
+        compressed = RadixNode(node.level, bool(node.groups))
+        compressed.prefix = tuple(prefix)
+        return self._build(node, compressed)
+
+    @staticmethod
+    def _matcher(node: Node) -> Matcher:
+        """
+        Cast a segment for a dynamic node into the matches. This is the same
+        casting that ``Node._inject_param_check`` generates.
+        """
+        param: ParamInfo = node.param
+        if param.regex:
+            pattern = param.pattern
+            group = 1 if pattern.groups else 0
+
+            def match_regex(matches, idx, segment):
+                match = pattern.match(segment)
+                if match:
+                    matches[idx] = match.group(group)
+                    return True
+                return False
+
+            return match_regex
+
+        if isinstance(param, AlternationParamInfo):
+            allowed = param.ctx.allowed
+
+            def match_alternation(matches, idx, segment):
+                if segment in allowed:
+                    matches[idx] = segment
+                    return True
+                return False
+
+            return match_alternation
+
+        if isinstance(param, ExtParamInfo):
+            ctx = param.ctx
+            allowed = ctx.allowed or None
+            unquote = node.unquote
+
+            def match_ext(matches, idx, segment):
+                return ext_segment(
+                    matches,
+                    idx,
+                    segment,
+                    ctx.allowed_sub_count,
+                    allowed,
+                    ctx.cast,
+                    unquote,
+                )
+
+            return match_ext
+
+        cast = param.cast
+        unquote = node.unquote and node.router.tree.cast_as_str(cast)
+
+        def match_cast(matches, idx, segment):
+            return cast_segment(matches, idx, cast, segment, unquote)
+
+        return match_cast
+
+    def find_route(self, path, method, router, basket, extra):
+        """
+        A drop in replacement for the generated ``find_route``
+        """
+        parts = tuple(path[1:].split(router.delimiter))
+        try:
+            group = router.static_routes[parts]
+        except KeyError:
+            pass
+        else:
+            basket["__raw_path__"] = path
+            return group, basket
+
+        leaf = self._walk(
+            self.root, parts, len(parts), 0, basket["__matches__"]
+        )
+        if leaf:
+            return leaf.select(method, extra), basket
+        return self._match_path(path, method, basket, extra)
+
+    def _match_path(self, path, method, basket, extra):
+        """
+        Match the routes that could not be in the tree against the whole path
+        """
+        for pattern, leaf in self.path_groups:
+            match = pattern.match(path)
+            if match:
+                route = leaf.select(method, extra)
+                basket["__params__"] = match.groupdict()
+                return route, basket
+        raise NotFound
+
+    def _walk(
+        self,
+        node: RadixNode,
+        parts: t.Tuple[str, ...],
+        num: int,
+        pos: int,
+        matches: t.Dict[int, t.Any],
+    ) -> t.Optional[Leaf]:
+        if pos == num:
+            return node.leaf
+
+        segment = parts[pos]
+        for entry in node.entries:
+            if entry.__class__ is dict:
+                child = entry.get(segment)
+                if child is None or num < child.min_num:
+                    continue
+                if child.prefix and (
+                    parts[pos + 1 : child.level] != child.prefix
+                ):
+                    continue
+            else:
+                matcher, child = entry
+                if num < child.min_num or not matcher(matches, pos, segment):
+                    continue
+
+            found = self._walk(child, parts, num, child.level, matches)
+            if found:
+                return found
+        return None
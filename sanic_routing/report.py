@@ -0,0 +1,132 @@
+"""
+Record where the time goes while a router is finalized, so that a route
+table that makes startup slower can be traced back to the phase (and the
+shape of the tree) that is to blame.
+"""
+
+import sys
+import typing as t
+
+from contextlib import contextmanager
+from time import perf_counter
+from types import CodeType
+
+from .tree import Node
+
+
+class Phase:
+    """
+    The wall time spent in a phase, and the number of memory blocks that
+    were still allocated at the end of it (which can be negative when it
+    freed more than it allocated)
+    """
+
+    __slots__ = ("blocks", "calls", "seconds")
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.blocks = 0
+        self.calls = 0
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "seconds": self.seconds,
+            "blocks": self.blocks,
+            "calls": self.calls,
+        }
+
+
+class FinalizeReport:
+    """
+    The phases of ``finalize``, in the order that they first ran, and some
+    statistics about the tree and the source that it was rendered into.
+    Finalize the router with ``report=True`` to have one kept on
+    ``router.finalize_report``.
+
+    The phases are:
+
+    - groups: finalizing and prioritizing the route groups
+    - routes: finalizing the params (and any regex) of every route
+    - tree: arranging the groups into a tree of nodes
+    - sort: ordering the children of every node
+    - static: indexing (and tuning) the lookup of static routes
+    - render: rendering the tree into source, or building the radix tree
+    - compile: compiling the source (and optimizing it, when asked to)
+    - exec: executing the compiled source into the namespace of find_route
+
+    When the subtrees are rendered in other processes (see ``workers``),
+    they are also compiled there, as part of rendering. That work is only
+    timed, its allocations are not counted.
+    """
+
+    def __init__(self) -> None:
+        self.phases: t.Dict[str, Phase] = {}
+        self.stats: t.Dict[str, int] = {}
+
+    @contextmanager
+    def measure(self, name: str) -> t.Iterator[Phase]:
+        phase = self.phases.setdefault(name, Phase())
+        blocks = sys.getallocatedblocks()
+        start = perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds += perf_counter() - start
+            phase.blocks += sys.getallocatedblocks() - blocks
+            phase.calls += 1
+
+    @property
+    def total(self) -> float:
+        return sum(phase.seconds for phase in self.phases.values())
+
+    def count_tree(self, root: Node) -> None:
+        """
+        The number of nodes below the root, how many levels deep they go,
+        and the most children that any one node has
+        """
+        nodes = depth = fan_out = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            fan_out = max(fan_out, len(node._children))
+            for child in node._children.values():
+                nodes += 1
+                depth = max(depth, child.level)
+                stack.append(child)
+        self.stats.update(nodes=nodes, depth=depth, fan_out=fan_out)
+
+    def count_code(self, src: str, code: t.Iterable[CodeType]) -> None:
+        """
+        The number of lines of source, and the size of the bytecode that
+        it was compiled into (including every function defined in it)
+        """
+        bytecode = 0
+        stack = list(code)
+        while stack:
+            obj = stack.pop()
+            bytecode += len(obj.co_code)
+            stack.extend(
+                const for const in obj.co_consts if isinstance(const, CodeType)
+            )
+        self.stats.update(lines=src.count("\n"), bytecode=bytecode)
+
+    def as_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "phases": {
+                name: phase.as_dict() for name, phase in self.phases.items()
+            },
+            "stats": dict(self.stats),
+            "total": self.total,
+        }
+
+    def __str__(self) -> str:
+        rows = [f"{'phase':<10} {'seconds':>9} {'blocks':>10}"]
+        rows += [
+            f"{name:<10} {phase.seconds:>9.3f} {phase.blocks:>10}"
+            for name, phase in self.phases.items()
+        ]
+        rows.append(f"{'total':<10} {self.total:>9.3f}")
+        rows += [
+            f"{name:<10} {value:>9}" for name, value in self.stats.items()
+        ]
+        return "\n".join(rows)
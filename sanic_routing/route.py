@@ -1,11 +1,12 @@
 import re
 import typing as t
 
+from functools import lru_cache
 from types import SimpleNamespace
 from warnings import warn
 
 from .exceptions import InvalidUsage, ParameterNameConflicts
-from .patterns import ParamInfo
+from .patterns import REGEX_ALTERNATION, AlternationParamInfo, ParamInfo
 from .utils import Immutable, parts_to_path, path_to_parts
 
 
@@ -18,6 +19,7 @@ class Route:
     __slots__ = (
         "_params",
         "_raw_path",
+        "_segments",
         "ctx",
         "extra",
         "handler",
@@ -97,6 +99,7 @@ class Route:
 
         self._params: t.Dict[int, ParamInfo] = {}
         self._raw_path = raw_path
+        self._segments: t.Optional[t.Tuple[str, ...]] = None
 
         # Main goal is to do some normalization. Any dynamic segments
         # that are missing a type are rewritten with str type
@@ -165,8 +168,9 @@ class Route:
             self.router.delimiter,
         )
         if not self.static:
-            parts = path_to_parts(key_path, self.router.delimiter)
-            for idx, part in enumerate(parts):
+            # The params are at the same position in the normalized parts as
+            # in the raw path, so there is no need to split the path again
+            for idx, part in enumerate(self.parts):
                 if part.startswith("<"):
                     (
                         name,
@@ -197,19 +201,24 @@ class Route:
         param_info_class=ParamInfo,
     ):
         if pattern and isinstance(pattern, str):
-            if not pattern.startswith("^"):
-                pattern = f"^{pattern}"
-            if not pattern.endswith("$"):
-                pattern = f"{pattern}$"
+            # Anchor the whole expression so that any alternation (eg. a|b)
+            # applies to the entire segment
+            if not pattern.startswith("^") or not pattern.endswith("$"):
+                pattern = f"^(?:{pattern})$"
 
             pattern = re.compile(pattern)
 
-        is_regex = label not in self.router.regex_types
-        priority = (
-            0
-            if is_regex
-            else list(self.router.regex_types.keys()).index(label)
-        )
+        is_alternation = bool(REGEX_ALTERNATION.match(label))
+        is_regex = label not in self.router.regex_types and not is_alternation
+        if is_regex:
+            priority = 0
+        elif is_alternation:
+            # Literal alternations are stricter than any other type, so they
+            # are given the highest priority
+            priority = len(self.router.regex_types)
+        else:
+            priority = self.router.regex_type_index[label]
+        self._segments = None
         self._params[idx] = param_info_class(
             name=name,
             raw_path=raw_path,
@@ -306,12 +315,14 @@ class Route:
         generalized so that any dynamic parts do not
         include param keys since they have no impact on routing.
         """
-        return tuple(
-            f"<__dynamic__:{self._params[idx].label}>"
-            if idx in self._params
-            else segment
-            for idx, segment in enumerate(self.parts)
-        )
+        if self._segments is None:
+            self._segments = tuple(
+                f"<__dynamic__:{self._params[idx].key}>"
+                if idx in self._params
+                else segment
+                for idx, segment in enumerate(self.parts)
+            )
+        return self._segments
 
     @property
     def uri(self):
@@ -322,10 +333,8 @@ class Route:
         return f"{self.router.delimiter}{self.path}"
 
     def _sorting(self, item) -> int:
-        try:
-            return list(self.router.regex_types.keys()).index(item.label)
-        except ValueError:
-            return len(list(self.router.regex_types.keys()))
+        index = self.router.regex_type_index
+        return index.get(item.label, len(index))
 
     def parse_parameter_string(self, parameter_string: str):
         """Parse a parameter string into its constituent name, type, and
@@ -341,40 +350,56 @@ class Route:
         :return: tuple containing
             (parameter_name, parameter_type, parameter_pattern)
         """  # noqa: E501
-        # We could receive NAME or NAME:PATTERN
-        parameter_string = parameter_string.strip("<>")
-        name = parameter_string
-        label = "str"
-
-        if ":" in parameter_string:
-            name, label = parameter_string.split(":", 1)
-            if "=" in label:
-                label, _ = label.split("=", 1)
-            if "=" in name:
-                name, _ = name.split("=", 1)
-
-            if not name:
-                raise ValueError(
-                    f"Invalid parameter syntax: {parameter_string}"
-                )
-            if label == "string":
-                warn(
-                    "Use of 'string' as a path parameter type is deprected, "
-                    "and will be removed in Sanic v21.12. "
-                    f"Instead, use <{name}:str>.",
-                    DeprecationWarning,
-                )
-            elif label == "number":
-                warn(
-                    "Use of 'number' as a path parameter type is deprected, "
-                    "and will be removed in Sanic v21.12. "
-                    f"Instead, use <{name}:float>.",
-                    DeprecationWarning,
-                )
-
-        default = (str, label, ParamInfo)
+        name, label = _split_parameter(parameter_string)
+        if label == "string":
+            warn(
+                "Use of 'string' as a path parameter type is deprected, "
+                "and will be removed in Sanic v21.12. "
+                f"Instead, use <{name}:str>.",
+                DeprecationWarning,
+            )
+        elif label == "number":
+            warn(
+                "Use of 'number' as a path parameter type is deprected, "
+                "and will be removed in Sanic v21.12. "
+                f"Instead, use <{name}:float>.",
+                DeprecationWarning,
+            )
+
+        default = (
+            str,
+            label,
+            AlternationParamInfo
+            if REGEX_ALTERNATION.match(label)
+            else ParamInfo,
+        )
 
         # Pull from pre-configured types
         found = self.router.regex_types.get(label, default)
         _type, pattern, param_info_class = found
         return name, label, _type, pattern, param_info_class
+
+
+@lru_cache(maxsize=4096)
+def _split_parameter(parameter_string: str) -> t.Tuple[str, str]:
+    """
+    Split a param declaration into its name and label. The same params
+    (eg. <id:int>) are declared over and over, so this is cached. The label
+    is only looked up in the regex types of the router afterwards, so the
+    cache can be shared by every router.
+    """
+    # We could receive NAME or NAME:PATTERN
+    parameter_string = parameter_string.strip("<>")
+    name = parameter_string
+    label = "str"
+
+    if ":" in parameter_string:
+        name, label = parameter_string.split(":", 1)
+        if "=" in label:
+            label, _ = label.split("=", 1)
+        if "=" in name:
+            name, _ = name.split("=", 1)
+
+        if not name:
+            raise ValueError(f"Invalid parameter syntax: {parameter_string}")
+    return name, label
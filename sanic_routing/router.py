@@ -1,10 +1,21 @@
 import ast
+import asyncio
+import json
+import marshal
 import sys
 import typing as t
 
 from abc import ABC, abstractmethod
-from types import SimpleNamespace
-from warnings import warn
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from copy import copy
+from functools import partial
+from itertools import accumulate, zip_longest
+from multiprocessing import get_all_start_methods, get_context
+from os import PathLike
+from threading import Lock, active_count, current_thread, main_thread
+from time import perf_counter
+from types import CodeType, SimpleNamespace
 
 from sanic_routing.group import RouteGroup
 from sanic_routing.patterns import ParamInfo
@@ -16,9 +27,22 @@ from .exceptions import (
     NoMethod,
     NotFound,
 )
-from .line import Line
-from .patterns import REGEX_TYPES, REGEX_TYPES_ANNOTATION
+from .line import Line, to_source
+from .optimizer import optimize
+from .patterns import (
+    REGEX_ALTERNATION,
+    REGEX_PARAM_NAME_EXT,
+    REGEX_SAMPLES,
+    REGEX_TYPES,
+    REGEX_TYPES_ANNOTATION,
+    AlternationParamInfo,
+    ExtParamInfo,
+)
+from .profile import RouteProfile
+from .radix import RadixTree
+from .report import FinalizeReport
 from .route import Route
+from .tiered import TieredTree
 from .tree import Node, Tree
 from .utils import parts_to_path, path_to_parts
 
@@ -30,11 +54,14 @@ from datetime import datetime  # noqa  isort:skip
 from urllib.parse import unquote  # noqa  isort:skip
 from uuid import UUID  # noqa  isort:skip
 from .patterns import parse_date, alpha, slug, nonemptystr  # noqa  isort:skip
+from .patterns import split_ext  # noqa  isort:skip
+from .patterns import cast_segment, ext_segment  # noqa  isort:skip
 
 
 class BaseRouter(ABC):
     DEFAULT_METHOD = "BASE"
     ALLOWED_METHODS: t.Tuple[str, ...] = tuple()
+    STATIC_STRATEGIES: t.Tuple[str, ...] = ("try", "in", "path")
 
     def __init__(
         self,
@@ -47,11 +74,22 @@ class BaseRouter(ABC):
         cascade_not_found: bool = False,
     ) -> None:
         self._find_route = None
+        # The find_route to call, and the router to call it with. All of the
+        # routing state is read through them, so they are swapped in one go
+        self._routing: t.Tuple[t.Any, BaseRouter] = (None, self)
+        self._optimized = False
+        self._chunk_ends: t.List[int] = []
         self._matchers = None
+        self._matcher_sources: t.Dict[str, int] = {}
         self.static_routes: t.Dict[t.Tuple[str, ...], RouteGroup] = {}
         self.dynamic_routes: t.Dict[t.Tuple[str, ...], RouteGroup] = {}
         self.regex_routes: t.Dict[t.Tuple[str, ...], RouteGroup] = {}
         self.name_index: t.Dict[str, Route] = {}
+        self.static_paths: t.Dict[str, RouteGroup] = {}
+        self.static_strategy = "try"
+        self.static_timings: t.Dict[str, float] = {}
+        self.profile: t.Optional[RouteProfile] = None
+        self.finalize_report: t.Optional[FinalizeReport] = None
         self.delimiter = delimiter
         self.exception = exception
         self.method_handler_exception = method_handler_exception
@@ -63,10 +101,30 @@ class BaseRouter(ABC):
         self.ctx = SimpleNamespace()
         self.cascade_not_found = cascade_not_found
 
+        # Routes that are added to (or removed from) the router after it is
+        # finalized are applied on the next resolve(), see refresh()
+        self._dirty = False
+        self._stale = False
+        self._pending: t.Dict[str, t.Set[t.Tuple[str, ...]]] = {}
+        self._pending_static: t.Set[t.Tuple[str, ...]] = set()
+        self._subtrees: t.Optional[t.Dict[str, t.Tuple[t.Any, ...]]] = None
+        self._static_lookup = False
+        self._finalize_options: t.Dict[str, t.Any] = {}
+        self._cold: t.Set[str] = set()
+        self._refresh_lock = Lock()
+
         self.regex_types: REGEX_TYPES_ANNOTATION = {}
+        self.regex_type_index: t.Dict[str, int] = {}
+        self.samples: t.Dict[str, str] = {}
 
         for label, (cast, pattern, param_info_class) in REGEX_TYPES.items():
-            self.register_pattern(label, cast, pattern, param_info_class)
+            self.register_pattern(
+                label,
+                cast,
+                pattern,
+                param_info_class,
+                sample=REGEX_SAMPLES.get(label),
+            )
 
     @abstractmethod
     def get(self, **kwargs):
@@ -80,11 +138,14 @@ class BaseRouter(ABC):
         orig: t.Optional[str] = None,
         extra: t.Optional[t.Dict[str, str]] = None,
     ) -> t.Tuple[Route, t.Callable[..., t.Any], t.Dict[str, t.Any]]:
+        if self._dirty:
+            self.refresh()
+        find_route, router = self._routing
         try:
-            route, param_basket = self.find_route(
+            route, param_basket = find_route(
                 path,
                 method,
-                self,
+                router,
                 {"__params__": {}, "__matches__": {}},
                 extra,
             )
@@ -124,12 +185,11 @@ class BaseRouter(ABC):
                 except KeyError:
                     continue
 
-                # Apply if tuple (from ext) or if it is not a regex matcher
+                # Apply if tuple (from ext), otherwise the value has already
+                # been cast (or matched) while traversing the tree
                 if isinstance(value, tuple):
                     param.process(params, value)
-                elif not route.regex or (
-                    route.regex and param.cast is not str
-                ):
+                else:
                     params[param.name] = value
 
         # Double check that if we made a match it is not a false positive
@@ -144,6 +204,9 @@ class BaseRouter(ABC):
                 allowed_methods=route.methods,
             )
 
+        if self.profile is not None:
+            self.profile.record(route)
+
         return route, route.handler, params
 
     def add(
@@ -162,6 +225,192 @@ class BaseRouter(ABC):
         *,
         priority: int = 0,
     ) -> Route:
+        with self._refresh_lock:
+            self._unshare()
+            route, routes = self._build_route(
+                path,
+                handler,
+                methods,
+                name,
+                requirements,
+                strict,
+                unquote,
+                overwrite,
+                append,
+                priority,
+            )
+            group = self._register_route(route, routes, overwrite, append)
+            group.finalize()
+            if self.finalized:
+                route.finalize()
+                group.prioritize_routes()
+                self._track(group)
+        return route
+
+    def remove(self, route: t.Union[Route, str]) -> None:
+        """
+        Remove a route, either the instance that ``add()`` returned or the
+        name of the route. The route can be removed after the router has
+        been finalized, the same as routes can be added.
+
+        :param route: The route (or its name)
+        :type route: t.Union[Route, str]
+        :raises InvalidUsage: The route is not on the router
+        """
+        if isinstance(route, str):
+            try:
+                route = self.name_index[route]
+            except KeyError:
+                raise InvalidUsage(f"Unknown route: {route}")
+
+        with self._refresh_lock:
+            self._unshare()
+            pools = (
+                self.static_routes,
+                self.dynamic_routes,
+                self.regex_routes,
+            )
+            for routes in pools:
+                group = routes.get(route.segments)
+                if group is not None and any(r is route for r in group):
+                    break
+            else:
+                raise InvalidUsage(
+                    f"Route is not registered: {route.raw_path}"
+                )
+
+            group = self._writable_group(routes, route.segments)
+            if self.finalized:
+                self._track(group)
+            group.remove_route(route)
+            if not group.routes:
+                del routes[route.segments]
+            elif self.finalized:
+                group.finalize()
+            if route.name and self.name_index.get(route.name) is route:
+                del self.name_index[route.name]
+
+    def add_many(
+        self, routes: t.Iterable[t.Mapping[str, t.Any]]
+    ) -> t.List[Route]:
+        """
+        Add a batch of routes, each of them given as the keyword arguments
+        to ``add()``. This is the same as calling ``add()`` for each of
+        them, but the groups that the routes are added to are only
+        finalized once, after all of them have been added. Since ``add()``
+        is not called, any subclass that overrides it should override this
+        as well.
+
+        .. code-block:: python
+
+            router.add_many(
+                [
+                    {"path": "/users", "handler": list_users},
+                    {
+                        "path": "/users/<id:int>",
+                        "handler": get_user,
+                        "methods": ["GET"],
+                    },
+                ]
+            )
+
+        :param routes: The keyword arguments for each route
+        :type routes: t.Iterable[t.Mapping[str, t.Any]]
+        :return: The routes that were added
+        :rtype: t.List[Route]
+        """
+        with self._refresh_lock:
+            self._unshare()
+            added: t.List[Route] = []
+            touched: t.Set[t.Tuple[str, ...]] = set()
+            for spec in routes:
+                overwrite = spec.get("overwrite", False)
+                append = spec.get("append", False)
+                route, pool = self._build_route(**spec)
+                self._register_route(route, pool, overwrite, append)
+                if self.finalized:
+                    route.finalize()
+                touched.add(route.segments)
+                added.append(route)
+
+            pools = (
+                self.static_routes,
+                self.dynamic_routes,
+                self.regex_routes,
+            )
+            for pool in pools:
+                for segments in touched:
+                    group = pool.get(segments)
+                    if group is not None:
+                        group.finalize()
+                        if self.finalized:
+                            group.prioritize_routes()
+                            self._track(group)
+        return added
+
+    def add_manifest(
+        self,
+        filename: t.Union[str, PathLike],
+        handlers: t.Mapping[str, t.Callable[..., t.Any]],
+    ) -> t.List[Route]:
+        """
+        Add the routes of a JSON manifest with ``add_many()``. The manifest
+        is a list of routes (or an object with a ``"routes"`` list), where
+        each route holds the keyword arguments to ``add()``, and its
+        ``"handler"`` is the key of the handler in ``handlers``.
+
+        :param filename: The JSON manifest
+        :type filename: t.Union[str, PathLike]
+        :param handlers: The handlers that the manifest refers to
+        :type handlers: t.Mapping[str, t.Callable[..., t.Any]]
+        :raises InvalidUsage: A route refers to an unknown handler
+        :return: The routes that were added
+        :rtype: t.List[Route]
+        """
+        with open(filename) as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            manifest = manifest.get("routes", [])
+
+        return self.add_many(self._with_handlers(manifest, handlers))
+
+    @staticmethod
+    def _with_handlers(
+        routes: t.Iterable[t.Mapping[str, t.Any]],
+        handlers: t.Mapping[str, t.Callable[..., t.Any]],
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """
+        Swap the key of the handler of each route for the handler itself
+        """
+        specs = []
+        for spec in routes:
+            try:
+                handler = handlers[spec["handler"]]
+            except KeyError:
+                raise InvalidUsage(
+                    f"Unknown handler in manifest: {spec.get('handler')}"
+                )
+            specs.append({**spec, "handler": handler})
+        return specs
+
+    def _build_route(
+        self,
+        path: str,
+        handler: t.Callable,
+        methods: t.Optional[
+            t.Union[t.Sequence[str], t.FrozenSet[str], str]
+        ] = None,
+        name: t.Optional[str] = None,
+        requirements: t.Optional[t.Dict[str, t.Any]] = None,
+        strict: bool = False,
+        unquote: bool = False,  # noqa
+        overwrite: bool = False,
+        append: bool = False,
+        priority: int = 0,
+    ) -> t.Tuple[Route, t.Dict[t.Tuple[str, ...], RouteGroup]]:
+        """
+        Create the route, and pick the pool of routes that it belongs in
+        """
         # Can add a route with overwrite, or append, not both.
         # - overwrite: if matching path exists, replace it
         # - append: if matching path exists, append handler to it
@@ -194,9 +443,6 @@ class BaseRouter(ABC):
                 f"Bad method: {bad}. Must be one of: {self.ALLOWED_METHODS}"
             )
 
-        if self.finalized:
-            raise FinalizationError("Cannot finalize router more than once.")
-
         static = "<" not in path and requirements is None
         regex = self._is_regex(path)
 
@@ -233,7 +479,20 @@ class BaseRouter(ABC):
             regex=regex,
             priority=priority,
         )
-        group = self.group_class(route)
+        return route, routes
+
+    def _register_route(
+        self,
+        route: Route,
+        routes: t.Dict[t.Tuple[str, ...], RouteGroup],
+        overwrite: bool,
+        append: bool,
+    ) -> RouteGroup:
+        """
+        Add the route to its group, merging it with any existing group for
+        the same path. The group still needs to be finalized.
+        """
+        static = route.static
 
         # Catch the scenario where a route is overloaded with and
         # and without requirements, first as dynamic then as static
@@ -243,22 +502,59 @@ class BaseRouter(ABC):
         # Catch the reverse scenario where a route is overload first as static
         # and then as dynamic
         if not static and route.segments in self.static_routes:
+            group = self.group_class(route)
             existing_group = self.static_routes.pop(route.segments)
             group.merge(existing_group, overwrite, append)
 
-        else:
-            if route.segments in routes:
-                existing_group = routes[route.segments]
-                group.merge(existing_group, overwrite, append)
+        elif route.segments in routes:
+            # Add to the existing group in place, which is the same as
+            # merging it into the new group
+            group = self._writable_group(routes, route.segments)
+            group.add_route(route, overwrite, append)
 
+        else:
+            group = self.group_class(route)
             routes[route.segments] = group
 
-        if name:
-            self.name_index[name] = route
+        if route.name:
+            self.name_index[route.name] = route
 
-        group.finalize()
+        return group
 
-        return route
+    def _unshare(self) -> None:
+        """
+        Give the router pools of routes of its own, when they are still the
+        ones that the published find_route looks routes up in. The changes
+        are only published by refresh(), so that a path that is resolved in
+        the meantime sees all of the routes as they were.
+        """
+        router = self._routing[1]
+        if router is not self and router.static_routes is self.static_routes:
+            self.static_routes = dict(self.static_routes)
+            self.dynamic_routes = dict(self.dynamic_routes)
+            self.regex_routes = dict(self.regex_routes)
+
+    def _writable_group(
+        self,
+        routes: t.Dict[t.Tuple[str, ...], RouteGroup],
+        segments: t.Tuple[str, ...],
+    ) -> RouteGroup:
+        """
+        The group of the segments in the pool, which is copied first when
+        the published find_route can still look it up
+        """
+        group = routes[segments]
+        router = self._routing[1]
+        if router is not self and any(
+            pool.get(segments) is group
+            for pool in (
+                router.static_routes,
+                router.dynamic_routes,
+                router.regex_routes,
+            )
+        ):
+            group = routes[segments] = copy(group)
+        return group
 
     def register_pattern(
         self,
@@ -266,6 +562,7 @@ class BaseRouter(ABC):
         cast: t.Callable[[str], t.Any],
         pattern: t.Union[t.Pattern, str],
         param_info_class: t.Type[ParamInfo] = ParamInfo,
+        sample: t.Optional[str] = None,
     ):
         """
         Add a custom parameter type to the router. The cast should raise a
@@ -284,6 +581,9 @@ class BaseRouter(ABC):
         :param pattern: A regular expression that could also match the path
             segment
         :type pattern: Union[t.Pattern, str]
+        :param sample: A segment of this type, used to generate paths for
+            ``warmup()``, defaults to None
+        :type sample: t.Optional[str], optional
         """
         if not isinstance(label, str):
             raise InvalidUsage(
@@ -307,8 +607,29 @@ class BaseRouter(ABC):
 
         globals()[cast.__name__] = cast
         self.regex_types[label] = (cast, pattern, param_info_class)
+        self.regex_type_index = {
+            label: idx for idx, label in enumerate(self.regex_types)
+        }
+        if sample is not None:
+            self.samples[label] = sample
 
-    def finalize(self, do_compile: bool = True, do_optimize: bool = False):
+    def finalize(
+        self,
+        do_compile: bool = True,
+        do_optimize: bool = False,
+        *,
+        split_depth: int = 16,
+        split_size: int = 256,
+        backend: str = "tree",
+        compile_threshold: int = 64,
+        static_strategy: str = "try",
+        traffic: t.Optional[t.Iterable[str]] = None,
+        profile: t.Optional[RouteProfile] = None,
+        cold_routes: t.Optional[t.Iterable[str]] = None,
+        cold_threshold: t.Optional[int] = None,
+        workers: int = 1,
+        report: bool = False,
+    ):
         """
         After all routes are added, we can put everything into a final state
         and build the routing dource
@@ -316,39 +637,210 @@ class BaseRouter(ABC):
         :param do_compile: Whether to compile the source, mainly a debugging
             tool, defaults to True
         :type do_compile: bool, optional
-        :param do_optimize: Experimental feature that uses AST module to make
-            some optimizations, defaults to False
+        :param do_optimize: Whether to run the generated source through
+            a set of AST optimizations (see ``sanic_routing.optimizer``)
+            before it is compiled, defaults to False
         :type do_optimize: bool, optional
+        :param split_depth: The number of path segments that are rendered
+            into a single function before deeper segments are moved into a
+            function of their own, which keeps the generated source within
+            Python's nesting limits. Use ``0`` to never split, defaults to 16
+        :type split_depth: int, optional
+        :param split_size: The number of nodes in a subtree before it is
+            moved into a function of its own. When the whole tree is larger
+            than this, every top level segment gets its own function and
+            ``find_route`` dispatches to them on the first segment of the
+            path. Use ``0`` to never split, defaults to 256
+        :type split_size: int, optional
+        :param backend: How the dynamic routes are rendered. ``"tree"`` nests
+            ``if`` blocks for every segment of the path. ``"match"`` renders
+            a single ``match`` statement with a ``case`` for every route,
+            which requires Python 3.10+ and does not split the source into
+            functions. ``"radix"`` does not generate any source, and
+            instead walks a compressed radix tree of the routes at runtime,
+            which makes finalizing near instant. ``"tiered"`` starts out the
+            same as ``"radix"``, but compiles each top level subtree the same
+            as ``"tree"`` once it has been hit ``compile_threshold`` times,
+            defaults to "tree"
+        :type backend: str, optional
+        :param compile_threshold: The number of hits before a subtree is
+            compiled by the tiered backend, defaults to 64
+        :type compile_threshold: int, optional
+        :param static_strategy: How the generated source looks up static
+            routes, one of ``STATIC_STRATEGIES``. Use ``"auto"`` to time
+            each of them against the routes (or ``traffic``) and use the
+            fastest. The choice and timings are kept on ``static_strategy``
+            and ``static_timings``, defaults to "try"
+        :type static_strategy: str, optional
+        :param traffic: A sample of paths to time the static strategies
+            against, defaults to None
+        :type traffic: t.Optional[t.Iterable[str]], optional
+        :param profile: The hits recorded on ``router.profile`` (or loaded
+            with ``RouteProfile.load``). Static segments that lead to the
+            most hit routes are tried before the other static segments
+            beside them, defaults to None
+        :type profile: t.Optional[RouteProfile], optional
+        :param cold_routes: The names (or paths) of routes that are rarely
+            hit. Subtrees that only hold cold routes are rendered into
+            functions of their own that are tried after their static
+            siblings, which keeps them out of the body of ``find_route``,
+            defaults to None
+        :type cold_routes: t.Optional[t.Iterable[str]], optional
+        :param cold_threshold: Also treat the routes that have no more than
+            this many hits in the ``profile`` as cold, defaults to None
+        :type cold_threshold: t.Optional[int], optional
+        :param workers: The number of processes to render and compile the
+            top level subtrees in, when ``find_route`` dispatches to them.
+            The processes are forked, so that they do not need to be sent
+            the tree. That is only done where ``fork`` is available, and
+            from the main thread while no other threads are running (for
+            example, not from ``rebuild_async()``). Otherwise, the tree is
+            rendered in this process, defaults to 1
+        :type workers: int, optional
+        :param report: Time each phase of finalizing, count the memory that
+            it allocates, and describe the tree and its source, in a
+            ``FinalizeReport`` kept on ``finalize_report``, defaults to False
+        :type report: bool, optional
         :raises FinalizationError: Cannot finalize if there are no routes, or
-            the router has already been finalized (can call reset() to undo it)
+            the router has already been finalized (can call reset() to undo
+            it), or the backend is not available
         """
         if self.finalized:
             raise FinalizationError("Cannot finalize router more than once.")
         if not self.routes:
             raise FinalizationError("Cannot finalize with no routes defined.")
+        if backend not in ("tree", "match", "radix", "tiered"):
+            raise FinalizationError(f"Unknown backend: {backend}")
+        if static_strategy not in (*self.STATIC_STRATEGIES, "auto"):
+            raise FinalizationError(
+                f"Unknown static strategy: {static_strategy}"
+            )
+        if cold_threshold is not None and profile is None:
+            raise FinalizationError("A cold threshold requires a profile")
+        if workers < 1:
+            raise FinalizationError("Cannot finalize with fewer than 1 worker")
+        if backend == "match" and sys.version_info < (3, 10):
+            raise FinalizationError(
+                "The match backend requires Python 3.10 or later"
+            )
         self.finalized = True
+        self._finalize_options = {
+            "do_compile": do_compile,
+            "do_optimize": do_optimize,
+            "split_depth": split_depth,
+            "split_size": split_size,
+            "backend": backend,
+            "compile_threshold": compile_threshold,
+            "static_strategy": static_strategy,
+            "profile": profile,
+            "cold_routes": cold_routes,
+            "cold_threshold": cold_threshold,
+            "workers": workers,
+            "report": report,
+        }
+        self.finalize_report = FinalizeReport() if report else None
 
-        for group in (
-            list(self.static_routes.values())
-            + list(self.dynamic_routes.values())
-            + list(self.regex_routes.values())
-        ):
-            group.finalize()
-            for route in group.routes:
-                route.finalize()
-            group.prioritize_routes()
+        self._finalize_groups()
 
         # Evaluates all of the paths and arranges them into a hierarchichal
         # tree of nodes
-        self._generate_tree()
-
-        # Renders the source code
-        self._render(do_compile, do_optimize)
+        self._cold = self._cold_paths(cold_routes, cold_threshold, profile)
+        self._generate_tree(profile, self._cold)
+        self.tree.split_depth = split_depth
+        self.tree.split_size = split_size
+
+        with self._measure("static"):
+            if backend in ("radix", "tiered"):
+                # These look up the static routes on their own, so there is
+                # nothing to tune
+                static_strategy = "try"
+            self._index_static_paths(static_strategy in ("path", "auto"))
+            self.static_timings = {}
+            if static_strategy == "auto":
+                self.static_timings = self._tune_static(traffic)
+                static_strategy = min(
+                    self.static_timings,
+                    key=self.static_timings.__getitem__,
+                    default="try",
+                )
+        self.static_strategy = static_strategy
+        # Do not tune it again when the router is finalized again
+        self._finalize_options["static_strategy"] = static_strategy
+        self._subtrees = None
+
+        if backend in ("radix", "tiered"):
+            # Nothing to render up front, the tree is walked at runtime
+            self.find_route_src = ""
+            self._optimized = False
+            self._static_lookup = True
+            if backend == "tiered":
+                self._matcher_sources = {}
+                self._matchers = []
+                self.tree.functions = {}
+                self.tree._split(self.tree.root)
+                radix: RadixTree = TieredTree(
+                    self, compile_threshold, self._namespace()
+                )
+            else:
+                radix = RadixTree(self)
+            with self._measure("render"):
+                radix.build(
+                    self.tree.root, self._get_non_static_non_path_groups(True)
+                )
+            self._find_route = radix.find_route
+        else:
+            # Renders the source code
+            self._render(do_compile, do_optimize, backend, workers)
+        if self.finalize_report is not None:
+            self.finalize_report.count_tree(self.tree.root)
+
+        # find_route is called with a (shallow) copy of the router, so that
+        # the routes that it looks up stay the same when another router is
+        # swapped in while it is running
+        self._routing = (self._find_route, copy(self))
+
+    def _finalize_groups(self) -> None:
+        groups = (
+            list(self.static_routes.values())
+            + list(self.dynamic_routes.values())
+            + list(self.regex_routes.values())
+        )
+        with self._measure("groups"):
+            for group in groups:
+                group.finalize()
+                group.prioritize_routes()
+        with self._measure("routes"):
+            for group in groups:
+                for route in group.routes:
+                    route.finalize()
+
+    def _measure(self, phase: str) -> t.ContextManager[t.Any]:
+        """
+        Time a phase of finalizing, when it is being reported on
+        """
+        if self.finalize_report is None:
+            return nullcontext()
+        return self.finalize_report.measure(phase)
+
+    def _index_static_paths(self, enabled: bool) -> None:
+        # Static routes can also be indexed on their path so that they can
+        # be looked up without splitting the path first
+        self.static_paths = {}
+        if enabled:
+            self.static_paths = {
+                self.delimiter.join(parts): group
+                for parts, group in self.static_routes.items()
+            }
 
     def reset(self):
         self.finalized = False
         self.tree = Tree(router=self)
         self._find_route = None
+        self._optimized = False
+        self._dirty = self._stale = False
+        self._pending = {}
+        self._pending_static = set()
+        self._subtrees = None
 
         for group in (
             list(self.static_routes.values())
@@ -359,6 +851,395 @@ class BaseRouter(ABC):
             for route in group.routes:
                 route.reset()
 
+    def build(
+        self, populate: t.Callable[["BaseRouter"], t.Any], **kwargs: t.Any
+    ) -> "BaseRouter":
+        """
+        Build a new router off to the side, which can then be swapped in
+        with ``swap()``. The new router is set up the same as this one (with
+        the same patterns), passed to ``populate`` to add its routes, and
+        finalized with the same options as this one, or ``kwargs``. Nothing
+        on this router is changed, so it can keep on resolving paths while
+        the new router is built (for example in another thread).
+
+        :param populate: Adds the routes to the new router
+        :type populate: t.Callable[[BaseRouter], t.Any]
+        :return: The new router, finalized
+        :rtype: BaseRouter
+        """
+        router = self._spawn(self.__class__, *self._settings())
+        populate(router)
+        router.finalize(**{**self._finalize_options, **kwargs})
+        return router
+
+    def build_in_process(
+        self,
+        routes: t.Iterable[t.Mapping[str, t.Any]],
+        handlers: t.Mapping[str, t.Callable[..., t.Any]],
+        **kwargs: t.Any,
+    ) -> "BaseRouter":
+        """
+        Build a new router the same as ``build()``, except that the source
+        is generated and compiled in a child process, which leaves the GIL
+        to the threads that are serving requests while that is done. The
+        routes are given the same as in ``add_manifest()``: the keyword
+        arguments to ``add()``, with the key of its handler in ``handlers``.
+
+        The routes are added to the new router in this process, since they
+        hold their handlers, and that still takes about as long as adding
+        them to any other router. The child process adds the same routes
+        (without their handlers) to a router of its own, and only generates,
+        renders and compiles the source there. It sends back the compiled
+        code, which is linked to the routes that were added here.
+
+        The child process is spawned rather than forked, which is safe to do
+        while other threads are running. So the router class, its exception
+        and route classes, and any custom pattern casts need to be
+        importable by the child process. Only the ``"tree"`` and ``"match"``
+        backends can be built this way.
+
+        :param routes: The keyword arguments for each route
+        :type routes: t.Iterable[t.Mapping[str, t.Any]]
+        :param handlers: The handlers that the routes refer to
+        :type handlers: t.Mapping[str, t.Callable[..., t.Any]]
+        :raises InvalidUsage: A route refers to an unknown handler
+        :raises FinalizationError: The backend generates no source
+        :return: The new router, finalized
+        :rtype: BaseRouter
+        """
+        options = {**self._finalize_options, **kwargs}
+        if options.get("backend", "tree") not in ("tree", "match"):
+            raise FinalizationError(
+                "Only the tree and match backends can be built in another "
+                "process"
+            )
+        for key in ("cold_routes", "traffic"):
+            if options.get(key) is not None:
+                options[key] = list(options[key])
+
+        specs = [dict(spec) for spec in routes]
+        linked = self._with_handlers(specs, handlers)
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=get_context("spawn")
+        ) as pool:
+            built = pool.submit(
+                _build_in_process,
+                self.__class__,
+                *self._settings(),
+                specs,
+                options,
+            ).result()
+
+        router = self._spawn(self.__class__, *self._settings())
+        router.add_many(linked)
+        router._link_built(built)
+        return router
+
+    def _settings(
+        self,
+    ) -> t.Tuple[t.Dict[str, t.Any], t.Tuple[t.Dict[str, t.Any], ...]]:
+        """
+        The arguments that the router was created with, and its patterns
+        """
+        arguments = {
+            "delimiter": self.delimiter,
+            "exception": self.exception,
+            "method_handler_exception": self.method_handler_exception,
+            "route_class": self.route_class,
+            "group_class": self.group_class,
+            "stacking": self.stacking,
+            "cascade_not_found": self.cascade_not_found,
+        }
+        patterns = (self.regex_types, self.regex_type_index, self.samples)
+        return arguments, patterns
+
+    @staticmethod
+    def _spawn(
+        router_class: t.Type["BaseRouter"],
+        arguments: t.Dict[str, t.Any],
+        patterns: t.Tuple[t.Dict[str, t.Any], ...],
+    ) -> "BaseRouter":
+        router = router_class(**arguments)
+        regex_types, regex_type_index, samples = patterns
+        router.regex_types = dict(regex_types)
+        router.regex_type_index = dict(regex_type_index)
+        router.samples = dict(samples)
+        return router
+
+    def _link_built(self, built: t.Dict[str, t.Any]) -> None:
+        """
+        Finalize the router with the source that was compiled for the same
+        routes in another process. Only the routes are finalized here, the
+        tree is not generated until the router is finalized again.
+        """
+        options = built["options"]
+        self.finalized = True
+        self._finalize_options = options
+        self._cold = built["cold"]
+        self._finalize_groups()
+
+        self.static_strategy = options["static_strategy"]
+        self.static_timings = built["static_timings"]
+        self._index_static_paths(self.static_strategy == "path")
+        self._static_lookup = bool(self.static_routes)
+        self._matcher_sources = {
+            source: idx for idx, source in enumerate(built["matchers"])
+        }
+        self.find_route_src = built["src"]
+        self._chunk_ends = built["chunk_ends"]
+        self._optimized = options["do_optimize"]
+        self._subtrees = None
+        self.finalize_report = built["report"]
+        with self._measure("exec"):
+            self._link(marshal.loads(code) for code in built["code"])
+        self._routing = (self._find_route, copy(self))
+
+    def swap(self, router: "BaseRouter") -> None:
+        """
+        Take over the routes and the compiled ``find_route`` of a router
+        that has been finalized (see ``build()``). The routing is published
+        with a single assignment, so a call to ``resolve()`` either sees all
+        of the old routes or all of the new ones. The other router shares
+        all of its state with this one afterwards, so it should not be used
+        on its own anymore.
+
+        :param router: The finalized router to take over
+        :type router: BaseRouter
+        :raises FinalizationError: The router has not been finalized
+        """
+        if not router.finalized:
+            raise FinalizationError(
+                "Cannot swap in a router before finalizing."
+            )
+        router.refresh()
+        self._routing = router._routing
+        state = dict(router.__dict__)
+        del state["_refresh_lock"]
+        self.__dict__.update(state)
+
+    def rebuild(
+        self, populate: t.Callable[["BaseRouter"], t.Any], **kwargs: t.Any
+    ) -> None:
+        """
+        Build a new router with ``build()``, and ``swap()`` it in
+        """
+        self.swap(self.build(populate, **kwargs))
+
+    async def rebuild_async(
+        self, populate: t.Callable[["BaseRouter"], t.Any], **kwargs: t.Any
+    ) -> None:
+        """
+        The same as ``rebuild()``, except that the new router is built in a
+        worker thread, so that the event loop is not blocked while the
+        source is generated and compiled. Paths are resolved with the old
+        routes until the new ones are swapped in.
+        """
+        loop = asyncio.get_running_loop()
+        router = await loop.run_in_executor(
+            None, partial(self.build, populate, **kwargs)
+        )
+        self.swap(router)
+
+    def warmup(self, iterations: int = 64) -> t.List[str]:
+        """
+        Resolve a sample path for every route, with every one of its
+        methods, ``iterations`` times. This gives the interpreter a chance
+        to specialize the matching code (and the tiered backend to compile
+        it) before any real requests are routed. It can be called again at
+        any time, for example right after a new router is swapped in.
+
+        The sample paths are generated from the route definitions, using
+        the ``samples`` of the param types. Routes with a regex param, or
+        a type without a sample, are skipped.
+
+        :param iterations: The number of times each path is resolved,
+            defaults to 64
+        :type iterations: int, optional
+        :raises FinalizationError: The router has not been finalized
+        :return: The sample paths that were resolved
+        :rtype: t.List[str]
+        """
+        if not self.finalized:
+            raise FinalizationError("Cannot warm up before finalizing.")
+
+        samples = []
+        for route in self.routes:
+            path = self._sample_path(route)
+            if path is not None:
+                extra = dict(route.requirements) or None
+                samples.extend(
+                    (path, method, extra) for method in route.methods
+                )
+
+        # Warming up should not show up as hits on the profile
+        profile, self.profile = self.profile, None
+        resolved: t.Dict[str, None] = {}
+        try:
+            for _ in range(iterations):
+                for path, method, extra in samples:
+                    try:
+                        self.resolve(path, method=method, extra=extra)
+                    except (NotFound, NoMethod):
+                        continue
+                    resolved[path] = None
+        finally:
+            self.profile = profile
+        return list(resolved)
+
+    def _sample_path(self, route: Route) -> t.Optional[str]:
+        """
+        A concrete path that the route should match, if one can be made
+        """
+        parts = list(route.parts)
+        for idx, param in route.params.items():
+            if isinstance(param, AlternationParamInfo):
+                value = min(param.ctx.allowed)
+            elif isinstance(param, ExtParamInfo):
+                filename = self.samples.get(param.ctx.cast_label or "str")
+                if filename is None:
+                    return None
+                extension = (
+                    param.ctx.allowed[0] if param.ctx.allowed else "txt"
+                )
+                value = f"{filename}.{extension}"
+            elif param.regex or param.label not in self.samples:
+                return None
+            else:
+                value = self.samples[param.label]
+            parts[idx] = value
+        return self.delimiter + self.delimiter.join(parts)
+
+    def refresh(self) -> None:
+        """
+        Apply the routes that were added or removed since the router was
+        finalized. Changes are only collected as they are made, and a burst
+        of them is applied all at once the next time that a path is
+        resolved. Call this to apply them before then, for example before
+        the next request comes in.
+
+        When ``find_route`` dispatches on the first segment of the path (see
+        ``split_size`` of ``finalize``), only the top level subtrees that
+        changed are rendered and compiled again. Any other change (for
+        example to a route with a ``path`` param, or a router that is too
+        small to be dispatched) finalizes the router again with the same
+        options.
+        """
+        with self._refresh_lock:
+            if not self._dirty:
+                return
+
+            pending, self._pending = self._pending, {}
+            pending_static, self._pending_static = self._pending_static, set()
+            stale, self._stale = self._stale, False
+            self._dirty = False
+
+            if stale:
+                self.reset()
+                self.finalize(**self._finalize_options)
+                return
+
+            if pending_static:
+                self.static_paths = dict(self.static_paths)
+            for segments in pending_static:
+                path = self.delimiter.join(segments)
+                group = self.static_routes.get(segments)
+                if group is None:
+                    self.static_paths.pop(path, None)
+                else:
+                    self.static_paths[path] = group
+
+            if pending:
+                self._rebuild_subtrees(pending)
+                self._swap_dispatch()
+            # Until now find_route looked routes up in the pools as they
+            # were before the changes (see _unshare)
+            self._routing = (self._find_route, copy(self))
+
+    def _track(self, group: RouteGroup) -> None:
+        """
+        Record that a group has changed since the router was finalized. The
+        group needs to still hold its routes.
+        """
+        segments = group.segments
+        if self.static_strategy == "path":
+            self._pending_static.add(segments)
+        if self.static_routes.get(segments) is group:
+            # Static routes are looked up on the router, but only when
+            # there were any static routes to render the lookup for
+            self._stale |= not self._static_lookup
+        elif self._subtrees is None or group.dynamic_path:
+            self._stale = True
+        else:
+            self._pending.setdefault(Tree.key(group), set()).add(segments)
+        self._dirty = True
+
+    def _rebuild_subtrees(
+        self, pending: t.Dict[str, t.Set[t.Tuple[str, ...]]]
+    ) -> None:
+        """
+        Generate, render and compile the top level subtrees that changed
+        from the groups that are in them now
+        """
+        tree = self.tree
+        pools = (self.dynamic_routes, self.regex_routes)
+        groups: t.Dict[str, t.List[RouteGroup]] = {}
+        for key, changed in pending.items():
+            existing = tree.root._children.get(key)
+            if existing is not None:
+                # Any group that is left empty has already been removed
+                changed |= {
+                    group.segments
+                    for group in tree.groups_below(existing)
+                    if group.routes
+                }
+            groups[key] = sorted(
+                (
+                    pool[segments]
+                    for segments in changed
+                    for pool in pools
+                    if segments in pool and not pool[segments].dynamic_path
+                ),
+                key=lambda group: group.depth,
+                reverse=True,
+            )
+
+        subtrees = t.cast(t.Dict[str, t.Tuple[t.Any, ...]], self._subtrees)
+        for key in groups:
+            subtrees.pop(key, None)
+        nodes = tree.rebuild(
+            groups, self._finalize_options["profile"], self._cold
+        )
+        matchers = t.cast(t.List[t.Pattern], self._matchers)
+        do_optimize = self._finalize_options["do_optimize"]
+        for node in nodes:
+            # Every subtree gets a namespace of its own, so that the names of
+            # its functions cannot clash with any that are already compiled
+            chunks = tree.render_subtree(node)
+            for source in list(self._matcher_sources)[len(matchers) :]:
+                matchers.append(re.compile(source))
+            ctx = self._namespace()
+            for chunk in chunks:
+                exec(self._compile(chunk, do_optimize), ctx)
+            self.find_route_src += "".join(chunks)
+            subtrees[node.part] = (
+                ctx[node.function],
+                ctx[f"leaves_{node.ident}"],
+            )
+
+    def _swap_dispatch(self) -> None:
+        """
+        Point the dispatch tables of ``find_route`` at the functions of the
+        top level subtrees, in the order of the tree
+        """
+        entries = t.cast(t.Dict[str, t.Tuple[t.Any, ...]], self._subtrees)
+        subtrees, fallback = self.tree.dispatch_nodes()
+        ctx = self._find_route.__globals__  # type: ignore
+        ctx["subtrees"] = {
+            part: tuple(entries[node.part] for node in nodes)
+            for part, nodes in subtrees.items()
+        }
+        ctx["fallback"] = tuple(entries[node.part] for node in fallback)
+
     def _get_non_static_non_path_groups(
         self, has_dynamic_path: bool
     ) -> t.List[RouteGroup]:
@@ -385,71 +1266,134 @@ class BaseRouter(ABC):
             reverse=True,
         )
 
-    def _generate_tree(self) -> None:
-        self.tree.generate(self._get_non_static_non_path_groups(False))
-        self.tree.finalize()
+    def _generate_tree(
+        self,
+        profile: t.Optional[RouteProfile] = None,
+        cold: t.Optional[t.Set[str]] = None,
+    ) -> None:
+        with self._measure("tree"):
+            self.tree.generate(self._get_non_static_non_path_groups(False))
+        with self._measure("sort"):
+            self.tree.finalize(profile, cold)
+
+    def _cold_paths(
+        self,
+        cold_routes: t.Optional[t.Iterable[str]],
+        cold_threshold: t.Optional[int],
+        profile: t.Optional[RouteProfile],
+    ) -> t.Set[str]:
+        """
+        The paths of the groups that only hold cold routes
+        """
+        wanted = {item.lstrip(self.delimiter) for item in cold_routes or ()}
+        cold = set()
+        for group in self._get_non_static_non_path_groups(False):
+            if (
+                cold_threshold is not None
+                and profile is not None
+                and profile.weight(group.path) <= cold_threshold
+            ) or all(
+                route.name in wanted or route.path in wanted
+                for route in group
+            ):
+                cold.add(group.path)
+        return cold
 
     def _render(
-        self, do_compile: bool = True, do_optimize: bool = False
+        self,
+        do_compile: bool = True,
+        do_optimize: bool = False,
+        backend: str = "tree",
+        workers: int = 1,
     ) -> None:
+        with self._measure("render"):
+            chunks, compiled = self._render_chunks(
+                do_compile, do_optimize, backend, workers
+            )
+
+        self.find_route_src = "".join(chunks)
+        self._chunk_ends = list(accumulate(map(len, chunks)))
+        self._optimized = do_optimize
+        report = self.finalize_report
+        if do_compile:
+            # Each function (and table) is compiled and executed on its own,
+            # so the interpreter only ever builds the AST of one of them at a
+            # time. They share their namespace, so it is the same as
+            # compiling the source all at once.
+            code: t.Iterable[CodeType] = (
+                precompiled or self._compile(chunk, do_optimize)
+                for chunk, precompiled in zip_longest(chunks, compiled)
+            )
+            if report is not None:
+                # Compiled up front, to time it apart from executing it
+                with report.measure("compile"):
+                    code = list(code)
+                report.count_code(self.find_route_src, code)
+            with self._measure("exec"):
+                self._link(code)
+        elif report is not None:
+            report.count_code(self.find_route_src, ())
+
+    def _render_chunks(
+        self,
+        do_compile: bool,
+        do_optimize: bool,
+        backend: str,
+        workers: int,
+    ) -> t.Tuple[t.List[str], t.List[t.Optional[CodeType]]]:
+        """
+        Render the source of find_route, and the functions and tables that
+        follow it, along with any of them that are already compiled
+        """
         # Initial boilerplate for the function source
+        self._static_lookup = bool(self.static_routes)
         src = [
             Line("def find_route(path, method, router, basket, extra):", 0),
-            Line("parts = tuple(path[1:].split(router.delimiter))", 1),
+            *self._static_lines(self.static_strategy),
         ]
-        delayed = []
-
-        # Add static path matching
-        if self.static_routes:
-            # TODO:
-            # - future improvement would be to decide which option to use
-            #   at runtime based upon the makeup of the router since this
-            #   potentially has an impact on performance
-            src += [
-                Line("try:", 1),
-                Line(
-                    "group = router.static_routes[parts]",
-                    2,
-                ),
-                Line("basket['__raw_path__'] = path", 2),
-                Line("return group, basket", 2),
-                Line("except KeyError:", 1),
-                Line("pass", 2),
-            ]
-            # src += [
-            #     Line("if parts in router.static_routes:", 1),
-            #     Line("route = router.static_routes[parts]", 2),
-            #     Line("basket['__raw_path__'] = route.path", 2),
-            #     Line("return route, basket", 2),
-            # ]
-            # src += [
-            #     Line("if path in router.static_routes:", 1),
-            #     Line("route = router.static_routes.get(path)", 2),
-            #     Line("basket['__raw_path__'] = route.path", 2),
-            #     Line("return route, basket", 2),
-            # ]
-
-        # Add in pre-compiled regular expressions so they do not need to
-        # compile at run time
-        if self.regex_routes:
-            routes = sorted(
-                self.regex_routes.values(),
-                key=lambda route: len(route.parts),
-                reverse=True,
-            )
-            delayed.append(Line("matchers = [", 0))
-            for idx, group in enumerate(routes):
-                group.pattern_idx = idx
-                delayed.append(Line(f"re.compile(r'^{group.pattern}$'),", 1))
-            delayed.append(Line("]", 0))
+        # The source of the functions and tables that follow find_route,
+        # and any of them that have already been compiled
+        chunks: t.List[str] = []
+        compiled: t.List[t.Optional[CodeType]] = []
+
+        # Regular expressions are registered as they are needed by the tree
+        # (per segment) and by path-like routes (the full path), and are
+        # pre-compiled below so they do not need to compile at run time
+        self._matcher_sources = {}
+        path_groups = self._get_non_static_non_path_groups(True)
+        for group in path_groups:
+            group.pattern_idx = self._matcher_idx(f"^{group.pattern}$")
 
         # Generate all the dynamic code
-        if self.dynamic_routes or self.regex_routes:
+        if (self.dynamic_routes or self.regex_routes) and backend == "match":
+            src += self.tree.render_match()
+        elif self.dynamic_routes or self.regex_routes:
+            if workers > 1 and self._can_fork():
+                tree_src, functions, compiled = self._render_forked(
+                    workers, do_compile, do_optimize
+                )
+            else:
+                tree_src, functions = self.tree.render()
             src += [Line("num = len(parts)", 1)]
-            src += self.tree.render()
+            src += tree_src
+            chunks += functions
+
+        if self._matcher_sources:
+            chunks.append(
+                to_source(
+                    [
+                        Line("matchers = [", 0),
+                        *(
+                            Line(f"re.compile({source!r}),", 1)
+                            for source in self._matcher_sources
+                        ),
+                        Line("]", 0),
+                    ]
+                )
+            )
 
         # Inject regex matching that could not be in the tree
-        for group in self._get_non_static_non_path_groups(True):
+        for group in path_groups:
             route_container = (
                 "regex_routes" if group.regex else "dynamic_routes"
             )
@@ -487,51 +1431,250 @@ class BaseRouter(ABC):
             )
 
         src.append(Line("raise NotFound", 1))
-        src.extend(delayed)
+        chunks.insert(0, to_source(src))
+        compiled.insert(0, None)
+        return chunks, compiled
 
-        self.find_route_src = "".join(
-            map(str, filter(lambda x: x.render, src))
-        )
-        if do_compile:
-            try:
-                syntax_tree = ast.parse(self.find_route_src)
-
-                if do_optimize:
-                    self._optimize(syntax_tree.body[0])
-
-                if sys.version_info.major == 3 and sys.version_info.minor >= 9:
-                    # This is purely a convenience thing. Python 3.9 added this
-                    # feature, so it allows us to see exactly how the
-                    # interpreter will see the code after compiling and any
-                    # optimizing.
-                    setattr(
-                        self,
-                        "find_route_src_compiled",
-                        ast.unparse(syntax_tree),  # type: ignore
-                    )
-
-                # Sometimes there may be missing meta data, so we add it back
-                # before compiling
-                ast.fix_missing_locations(syntax_tree)
-
-                compiled_src = compile(
-                    syntax_tree,
-                    "",
-                    "exec",
+    def _render_forked(
+        self, workers: int, do_compile: bool, do_optimize: bool
+    ) -> t.Tuple[t.List[Line], t.List[str], t.List[t.Optional[CodeType]]]:
+        """
+        Render (and compile) the top level subtrees in forked processes,
+        which inherit the tree, and put their source back together the same
+        as ``Tree.render()``. Each process only shares functions between the
+        subtrees that it renders.
+        """
+        tree = self.tree
+        if not tree.plan():
+            return (*self.tree.root.render(), [])
+
+        # The matchers are registered up front, so that every process finds
+        # them at the same index
+        for source in tree.matcher_sources():
+            self._matcher_idx(source)
+
+        # Hand out runs of top level nodes with about as many groups each,
+        # a few times more of them than there are processes
+        children = list(tree.root.children.values())
+        weights = [sum(1 for _ in tree.groups_below(c)) for c in children]
+        share = max(sum(weights) // (workers * 4), 1)
+        batches: t.List[t.List[str]] = [[]]
+        weight = 0
+        for child, child_weight in zip(children, weights):
+            if weight >= share:
+                batches.append([])
+                weight = 0
+            batches[-1].append(child.part)
+            weight += child_weight
+
+        # The processes are forked, so the router is handed to them as it
+        # is, without being pickled
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(batches)),
+            mp_context=get_context("fork"),
+            initializer=_adopt,
+            initargs=(self,),
+        ) as pool:
+            results = list(
+                pool.map(
+                    partial(
+                        _render_subtrees,
+                        do_compile=do_compile,
+                        do_optimize=do_optimize,
+                    ),
+                    batches,
                 )
-            except SyntaxError as se:
-                syntax_error = (
-                    f"Line {se.lineno}: {se.msg}\n{se.text}"
-                    f"{' '*max(0,int(se.offset or 0)-1) + '^'}"
+            )
+
+        functions: t.List[str] = []
+        compiled: t.List[t.Optional[CodeType]] = []
+        for batch, (chunks, code, names) in zip(batches, results):
+            functions += chunks
+            compiled += [marshal.loads(chunk) for chunk in code]
+            for part, name in zip(batch, names):
+                tree.root.children[part].function = name
+        functions.append(to_source(tree._dispatch_table()))
+        return tree._inject_dispatch(), functions, compiled
+
+    @staticmethod
+    def _can_fork() -> bool:
+        """
+        Whether worker processes can be forked. Forking a process that is
+        running other threads can leave the children waiting on locks that
+        those threads held, so it is only done from the main thread while
+        it is the only one.
+        """
+        return (
+            "fork" in get_all_start_methods()
+            and current_thread() is main_thread()
+            and active_count() == 1
+        )
+
+    def _source_chunks(self) -> t.Iterator[str]:
+        """
+        The source of find_route, and of each function (and table) that
+        follows it, as they were rendered
+        """
+        start = 0
+        for end in self._chunk_ends:
+            yield self.find_route_src[start:end]
+            start = end
+
+    def _link(self, code: t.Iterable[CodeType]) -> None:
+        """
+        Execute the compiled source into a namespace of its own, and pick
+        out the functions that are called from it
+        """
+        ctx = self._namespace()
+        for chunk in code:
+            exec(chunk, ctx)
+        self._find_route = ctx["find_route"]
+        self._matchers = ctx.get("matchers", [])
+
+        # Keep the function of every top level subtree, so that they can
+        # be rebuilt one at a time when routes are added or removed
+        if self.tree.dispatch:
+            self._subtrees = {
+                child.part: (
+                    ctx[child.function],
+                    ctx[f"leaves_{child.ident}"],
                 )
-                raise FinalizationError(
-                    f"Cannot compile route AST:\n{self.find_route_src}"
-                    f"\n{syntax_error}"
+                for child in self.tree.root.children.values()
+            }
+
+    @staticmethod
+    def _compile(src: str, do_optimize: bool) -> CodeType:
+        try:
+            # The source is compiled straight into a code object, which is
+            # much faster than building (and walking) the AST in Python. The
+            # AST is only needed to run the optimizations.
+            return compile(
+                optimize(ast.parse(src)) if do_optimize else src,
+                "",
+                "exec",
+            )
+        except SyntaxError as se:
+            syntax_error = (
+                f"Line {se.lineno}: {se.msg}\n{se.text}"
+                f"{' '*max(0,int(se.offset or 0)-1) + '^'}"
+            )
+            raise FinalizationError(
+                f"Cannot compile route AST:\n{src}\n{syntax_error}"
+            )
+
+    def _static_lines(self, strategy: str) -> t.List[Line]:
+        """
+        Split the path into its parts, and match any static routes using one
+        of the STATIC_STRATEGIES:
+
+        - try: look up the parts, and catch the KeyError on a miss
+        - in: check that the parts are in the static routes before looking
+          them up
+        - path: look up the path itself before it is split, which requires
+          the static routes to be indexed on their path (static_paths)
+        """
+        split = Line("parts = tuple(path[1:].split(router.delimiter))", 1)
+        if not self.static_routes:
+            return [split]
+
+        found = [
+            Line("basket['__raw_path__'] = path", 2),
+            Line("return group, basket", 2),
+        ]
+        if strategy == "in":
+            return [
+                split,
+                Line("if parts in router.static_routes:", 1),
+                Line("group = router.static_routes[parts]", 2),
+                *found,
+            ]
+
+        lookup = "router.static_routes[parts]"
+        if strategy == "path":
+            lookup = "router.static_paths[path[1:]]"
+        lines = [
+            Line("try:", 1),
+            Line(f"group = {lookup}", 2),
+            *found,
+            Line("except KeyError:", 1),
+            Line("pass", 2),
+        ]
+        return lines + [split] if strategy == "path" else [split] + lines
+
+    def _tune_static(
+        self, traffic: t.Optional[t.Iterable[str]] = None
+    ) -> t.Dict[str, float]:
+        """
+        Time every one of the STATIC_STRATEGIES against a sample of paths,
+        and return the seconds per lookup for each of them. Unless a sample
+        of the traffic is given, every static path is used along with a
+        path for every dynamic route (which will miss).
+        """
+        paths = list(self._static_sample() if traffic is None else traffic)
+        if not paths:
+            return {}
+
+        timings = {}
+        loops = max(1, 5000 // len(paths))
+        basket: t.Dict[str, t.Any] = {}
+        for strategy in self.STATIC_STRATEGIES:
+            src = "".join(
+                map(
+                    str,
+                    [
+                        Line("def lookup(path, router, basket):", 0),
+                        *self._static_lines(strategy),
+                    ],
                 )
-            ctx: t.Dict[t.Any, t.Any] = {}
-            exec(compiled_src, None, ctx)
-            self._find_route = ctx["find_route"]
-            self._matchers = ctx.get("matchers")
+            )
+            ctx: t.Dict[str, t.Any] = {}
+            exec(compile(src, "", "exec"), ctx)
+            lookup = ctx["lookup"]
+            best = float("inf")
+            for _ in range(3):
+                start = perf_counter()
+                for _ in range(loops):
+                    for path in paths:
+                        lookup(path, self, basket)
+                best = min(best, perf_counter() - start)
+            timings[strategy] = best / (loops * len(paths))
+        return timings
+
+    def _static_sample(self) -> t.List[str]:
+        """
+        A path for every static route, and one for every dynamic route in
+        which each param is replaced with a segment that will not match it
+        """
+        delimiter = self.delimiter
+        return [
+            delimiter + delimiter.join(parts) for parts in self.static_routes
+        ] + [
+            delimiter
+            + delimiter.join(
+                "_" if part.startswith("<") else part for part in parts
+            )
+            for parts in (*self.dynamic_routes, *self.regex_routes)
+        ]
+
+    def _namespace(self) -> t.Dict[str, t.Any]:
+        """
+        The generated functions call one another, so they need to share
+        their own global namespace. The leaves tables are looked up on the
+        router when the source is executed.
+        """
+        ctx: t.Dict[str, t.Any] = dict(globals())
+        ctx["router"] = self
+        return ctx
+
+    def _matcher_idx(self, source: str) -> int:
+        """
+        Register a regular expression to be pre-compiled into the
+        ``matchers`` of the generated source, and return its index. Identical
+        expressions share a single matcher.
+        """
+        return self._matcher_sources.setdefault(
+            source, len(self._matcher_sources)
+        )
 
     @property
     def find_route(self):
@@ -541,6 +1684,22 @@ class BaseRouter(ABC):
     def matchers(self):
         return self._matchers
 
+    @property
+    def find_route_src_compiled(self) -> str:
+        """
+        The generated source as the interpreter sees it after compiling and
+        any optimizing. This is purely a debugging convenience, and is only
+        rendered when it is accessed. It requires Python 3.9+.
+        """
+        if sys.version_info < (3, 9):
+            raise AttributeError(
+                "find_route_src_compiled requires Python 3.9 or later"
+            )
+        module = ast.parse(self.find_route_src)
+        if self._optimized:
+            module = optimize(module)
+        return ast.unparse(module)  # type: ignore
+
     @property
     def groups(self):
         return {
@@ -555,72 +1714,6 @@ class BaseRouter(ABC):
             [route for group in self.groups.values() for route in group]
         )
 
-    def _optimize(self, node) -> None:
-        warn(
-            "Router AST optimization is an experimental only feature. "
-            "Results may vary from unoptimized code."
-        )
-        if hasattr(node, "body"):
-            for child in node.body:
-                self._optimize(child)
-
-            # concatenate nested single if blocks
-            # EXAMPLE:
-            #      if parts[1] == "foo":
-            #          if num > 3:
-            # BECOMES:
-            #       if parts[1] == 'foo' and num > 3:
-            # Testing has shown that further recursion does not actually
-            # produce any faster results.
-            if self._is_lone_if(node) and self._is_lone_if(node.body[0]):
-                current = node.body[0]
-                nested = node.body[0].body[0]
-
-                values: t.List[t.Any] = []
-                for test in [current.test, nested.test]:
-                    if isinstance(test, ast.Compare):
-                        values.append(test)
-                    elif isinstance(test, ast.BoolOp) and isinstance(
-                        test.op, ast.And
-                    ):
-                        values.extend(test.values)
-                    else:
-                        ...
-                combined = ast.BoolOp(op=ast.And(), values=values)
-
-                current.test = combined
-                current.body = nested.body
-
-            # Look for identical successive if blocks
-            # EXAMPLE:
-            #       if num == 5:
-            #           foo1()
-            #       if num == 5:
-            #           foo2()
-            # BECOMES:
-            #       if num == 5:
-            #           foo1()
-            #           foo2()
-            if (
-                all(isinstance(child, ast.If) for child in node.body)
-                # TODO: create func to peoperly compare equality of conditions
-                # and len({child.test for child in node.body})
-                and len(node.body) > 1
-            ):
-                first, *rem = node.body
-                for item in rem:
-                    first.body.extend(item.body)
-
-                node.body = [first]
-
-        if hasattr(node, "orelse"):
-            for child in node.orelse:
-                self._optimize(child)
-
-    @staticmethod
-    def _is_lone_if(node):
-        return len(node.body) == 1 and isinstance(node.body[0], ast.If)
-
     def _is_regex(self, path: str):
         parts = path_to_parts(path, self.delimiter)
 
@@ -628,12 +1721,94 @@ class BaseRouter(ABC):
             if not part.startswith("<") or ":" not in part:
                 return False
 
+            # Filename matching is handled by the tree
+            if REGEX_PARAM_NAME_EXT.match(part):
+                return False
+
             _, pattern_type, *__ = part[1:-1].split(":")
 
             return (
                 part.endswith(":path>")
                 or self.delimiter in part
-                or pattern_type not in self.regex_types
+                or (
+                    pattern_type not in self.regex_types
+                    and not REGEX_ALTERNATION.match(pattern_type)
+                )
             )
 
         return any(requires(part) for part in parts)
+
+
+def _build_in_process(
+    router_class: t.Type[BaseRouter],
+    arguments: t.Dict[str, t.Any],
+    patterns: t.Tuple[t.Dict[str, t.Any], ...],
+    routes: t.List[t.Dict[str, t.Any]],
+    options: t.Dict[str, t.Any],
+) -> t.Dict[str, t.Any]:
+    """
+    Add the routes to a new router and render its source, compiled and
+    marshaled, to send back from the child process. The key of the handler
+    of each route stands in for the handler itself, since only the code is
+    sent back.
+    """
+    router = BaseRouter._spawn(router_class, arguments, patterns)
+    router.add_many(routes)
+    router.finalize(**{**options, "do_compile": False})
+    do_optimize = options.get("do_optimize", False)
+    with router._measure("compile"):
+        code = [
+            router._compile(chunk, do_optimize)
+            for chunk in router._source_chunks()
+        ]
+    if router.finalize_report is not None:
+        router.finalize_report.count_code(router.find_route_src, code)
+    return {
+        "code": [marshal.dumps(chunk) for chunk in code],
+        "chunk_ends": router._chunk_ends,
+        "src": router.find_route_src,
+        "matchers": list(router._matcher_sources),
+        "options": {**router._finalize_options, "do_compile": True},
+        "cold": router._cold,
+        "static_timings": router.static_timings,
+        "report": router.finalize_report,
+    }
+
+
+# The router that a worker process renders, set when the process starts
+_forked: t.Optional[BaseRouter] = None
+
+
+def _adopt(router: BaseRouter) -> None:
+    global _forked
+    _forked = router
+
+
+def _render_subtrees(
+    parts: t.List[str], do_compile: bool, do_optimize: bool
+) -> t.Tuple[t.List[str], t.List[bytes], t.List[str]]:
+    """
+    Render (and compile) some of the top level nodes of the router that the
+    worker process was started with. Returns their source, the
+    marshaled code, and the name of the function of each node.
+    """
+    router = t.cast(BaseRouter, _forked)
+    children = router.tree.root.children
+    nodes = [children[part] for part in parts]
+
+    # The first node is looked at when rendering its siblings, so it is
+    # always rendered first
+    first = next(iter(children.values()))
+    if first.part not in parts:
+        first.to_src()
+
+    registered = len(router._matcher_sources)
+    chunks = router.tree.render_subtrees(nodes)
+    if len(router._matcher_sources) != registered:
+        raise FinalizationError("A matcher was not registered before forking")
+    code = [
+        marshal.dumps(router._compile(chunk, do_optimize))
+        for chunk in chunks
+        if do_compile
+    ]
+    return chunks, code, [node.function for node in nodes]
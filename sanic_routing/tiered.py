@@ -0,0 +1,161 @@
+"""
+A matching engine that starts out walking the radix tree for every top level
+subtree, and compiles a subtree into generated source once it becomes hot.
+It is used when the router is finalized with ``backend="tiered"``.
+"""
+
+import re
+import typing as t
+
+from functools import partial
+from threading import Lock
+
+from .group import RouteGroup
+from .radix import Matcher, RadixNode, RadixTree
+from .tree import Node, Tree
+
+
+class Tier:
+    """
+    A top level subtree. It is resolved by ``_interpret`` until it has been
+    hit ``threshold`` times, after which ``resolve`` is swapped for the
+    compiled function.
+    """
+
+    __slots__ = ("engine", "hits", "matcher", "node", "radix", "resolve")
+
+    def __init__(
+        self,
+        engine: "TieredTree",
+        node: Node,
+        radix: RadixNode,
+        matcher: t.Optional[Matcher] = None,
+    ) -> None:
+        self.engine = engine
+        self.node = node
+        self.radix = radix
+        self.matcher = matcher
+        self.hits = 0
+        self.resolve: t.Callable[..., t.Any] = self._interpret
+
+    @property
+    def compiled(self) -> bool:
+        return self.resolve != self._interpret
+
+    def _interpret(self, path, method, router, basket, extra, parts, num):
+        self.hits += 1
+        if self.hits >= self.engine.threshold and self.engine.compile(self):
+            return self.resolve(
+                path, method, router, basket, extra, parts, num
+            )
+
+        radix = self.radix
+        matches = basket["__matches__"]
+        if num < radix.min_num:
+            return None
+        if self.matcher:
+            if not self.matcher(matches, 0, parts[0]):
+                return None
+        elif radix.prefix and parts[1 : radix.level] != radix.prefix:
+            return None
+
+        leaf = self.engine._walk(radix, parts, num, radix.level, matches)
+        if leaf:
+            return leaf.select(method, extra), basket
+        return None
+
+
+class TieredTree(RadixTree):
+    def __init__(
+        self, router, threshold: int, namespace: t.Dict[str, t.Any]
+    ) -> None:
+        super().__init__(router)
+        self.threshold = threshold
+        self.namespace = namespace
+        self.subtrees: t.Dict[str, t.Tuple[Tier, ...]] = {}
+        self.fallback: t.Tuple[Tier, ...] = ()
+        self.tiers: t.List[Tier] = []
+        self._lock = Lock()
+
+    def build(
+        self, tree_root: Node, path_groups: t.Iterable[RouteGroup]
+    ) -> None:
+        """
+        Build a tier for every top level node, and dispatch to them on the
+        first segment of the path the same way that the tree backend does
+        """
+        self._build_paths(path_groups)
+        self.tiers = tiers = []
+        for child in tree_root.children.values():
+            if child.dynamic:
+                radix = self._build(
+                    child, RadixNode(child.level, bool(child.groups))
+                )
+                tiers.append(Tier(self, child, radix, self._matcher(child)))
+            else:
+                tiers.append(Tier(self, child, self._build_static(child)))
+
+        self.subtrees = {
+            tier.node.part: tuple(
+                other for other in tiers if other.matcher or other is tier
+            )
+            for tier in tiers
+            if not tier.matcher
+        }
+        self.fallback = tuple(tier for tier in tiers if tier.matcher)
+
+    def compile(self, tier: Tier) -> bool:
+        """
+        Render the subtree of the tier into its own function, and swap it in
+        as the way that the tier is resolved. Returns whether the tier is
+        compiled.
+        """
+        if not self._lock.acquire(blocking=False):
+            # Some other thread is already compiling, so keep interpreting
+            return tier.compiled
+        try:
+            if tier.compiled:
+                return True
+
+            router = self.router
+            node = tier.node
+            node.function = Tree._function_name(node)
+            _, definition = node.render()
+            src = "".join(definition)
+
+            # Any new regex matchers need to be compiled before the function
+            # can be called
+            matchers = router._matchers
+            for source in list(router._matcher_sources)[len(matchers) :]:
+                matchers.append(re.compile(source))
+
+            exec(compile(src, "", "exec"), self.namespace)
+            function = self.namespace[node.function]
+            leaves = self.namespace[f"leaves_{node.ident}"]
+            router.find_route_src += src
+            tier.resolve = partial(function, leaves)
+            return True
+        finally:
+            self._lock.release()
+
+    def find_route(self, path, method, router, basket, extra):
+        """
+        A drop in replacement for the generated ``find_route``
+        """
+        parts = tuple(path[1:].split(router.delimiter))
+        try:
+            group = router.static_routes[parts]
+        except KeyError:
+            pass
+        else:
+            basket["__raw_path__"] = path
+            return group, basket
+
+        num = len(parts)
+        for tier in self.subtrees.get(parts[0], self.fallback):
+            found = tier.resolve(
+                path, method, router, basket, extra, parts, num
+            )
+            if found:
+                return found
+        return self._match_path(path, method, basket, extra)
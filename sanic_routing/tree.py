@@ -1,16 +1,35 @@
 import typing as t
 
+from bisect import bisect
+from itertools import chain, groupby
 from logging import getLogger
 
 from .group import RouteGroup
-from .line import Line
-from .patterns import REGEX_PARAM_NAME, REGEX_PARAM_NAME_EXT, alpha, ext, slug
+from .line import Line, to_source
+from .patterns import (
+    REGEX_PARAM_NAME,
+    REGEX_PARAM_NAME_EXT,
+    AlternationParamInfo,
+    ExtParamInfo,
+    alpha,
+    ext,
+    slug,
+)
+from .profile import RouteProfile
 
 
 logger = getLogger("sanic.root")
 
+# A node that is being rendered, with its src, delayed and final output so
+# far, and the children that are still left to render
+_Frame = t.Tuple[
+    "Node", t.List[Line], t.List[Line], t.List[str], t.Iterator["Node"]
+]
+
 
 class Node:
+    SIGNATURE = "path, method, router, basket, extra, parts, num"
+
     def __init__(
         self,
         part: str = "",
@@ -39,6 +58,14 @@ class Node:
         self.equality_check = False
         self.unquote = unquote
         self.router = router
+        self.function: t.Optional[str] = None
+        self.leaves: t.List[str] = []
+        self.table = ""
+        self.hits = 0
+        self.cold = False
+        self.idx = 1
+        self.ident = "1"
+        self._depth: t.Optional[int] = None
 
     def __str__(self) -> str:
         internals = ", ".join(
@@ -51,36 +78,55 @@ class Node:
     def __repr__(self) -> str:
         return str(self)
 
-    @property
-    def ident(self) -> str:
-        prefix = (
-            f"{self.parent.ident}."
-            if self.parent and not self.parent.root
-            else ""
-        )
-        return f"{prefix}{self.idx}"
-
-    @property
-    def idx(self) -> int:
-        if not self.parent:
-            return 1
-        return list(self.parent.children.keys()).index(self.part) + 1
-
     def finalize_children(self):
         """
         Sort the children (if any), and set properties for easy checking
         # they are at the beginning or end of the line.
         """
-        self.children = {
-            k: v for k, v in sorted(self._children.items(), key=self._sorting)
-        }
+        self._order_children()
+        for child in self.children.values():
+            child.finalize_children()
+
+    def _order_children(self) -> None:
+        items = sorted(self._children.items(), key=self._sorting)
+        if self.hits or any(child.cold for child in self._children.values()):
+            items = self._reorder_static(items)
+        self.children = {k: v for k, v in items}
         if self.children:
+            for child in self.children.values():
+                child.first = child.last = False
             keys = list(self.children.keys())
             self.children[keys[0]].first = True
             self.children[keys[-1]].last = True
 
-            for child in self.children.values():
-                child.finalize_children()
+            # The position of every node is only known once its siblings
+            # are sorted, so this is where it is identified
+            prefix = "" if self.root else f"{self.ident}."
+            for idx, child in enumerate(self.children.values(), 1):
+                child.idx = idx
+                child.ident = f"{prefix}{idx}"
+
+    @staticmethod
+    def _reorder_static(
+        items: t.List[t.Tuple[str, "Node"]]
+    ) -> t.List[t.Tuple[str, "Node"]]:
+        """
+        Try the most hit children first, and the cold children last. Only
+        runs of static siblings are reordered, since only one of them can
+        ever match a segment. Dynamic siblings could match the same segment,
+        so their order is kept.
+        """
+        reordered: t.List[t.Tuple[str, "Node"]] = []
+        for (dynamic, _), run in groupby(
+            items, key=lambda item: (item[1].dynamic, bool(item[1].groups))
+        ):
+            run_items = list(run)
+            if not dynamic:
+                run_items.sort(
+                    key=lambda item: (item[1].cold, item[1].hits * -1)
+                )
+            reordered += run_items
+        return reordered
 
     def display(self) -> None:
         """
@@ -90,23 +136,111 @@ class Node:
         for child in self.children.values():
             child.display()
 
-    def render(self) -> t.Tuple[t.List[Line], t.List[Line]]:
-        # output - code injected into the source as it is being
-        #    called/evaluated
+    def render(self) -> t.Tuple[t.List[Line], t.List[str]]:
+        """
+        Render the node and all of its children. Returns the lines that are
+        injected where the node is, and the source of any functions that
+        nodes were split out into, which is injected at the very end.
+
+        The tree is walked with a stack instead of by recursion. A function
+        is rendered into source as soon as its body is complete, so only the
+        lines of the functions that are still being rendered (at most one
+        per level of the tree) are ever held at the same time.
+        """
+        stack = [self._open()]
+        while True:
+            node, src, delayed, final, children = stack[-1]
+            child = next(children, None)
+            if child is not None:
+                stack.append(child._open())
+                continue
+
+            stack.pop()
+            if node.function:
+                output, functions = node._render_function(
+                    src + delayed, final
+                )
+            else:
+                output, functions = src + delayed, final
+            if not stack:
+                return output, functions
+            _, parent_src, _, parent_final, _ = stack[-1]
+            parent_src.extend(output)
+            parent_final.extend(functions)
+
+    def _open(self) -> _Frame:
+        # src - code injected into the source as it is being called/evaluated
         # delayed - code that is injected after you do all of its children
         #    first
-        # final - code that is injected at the very end of all rendering
+        # final - source that is injected at the very end of all rendering
         src: t.List[Line] = []
         delayed: t.List[Line] = []
-        final: t.List[Line] = []
-
+        final: t.List[str] = []
         if not self.root:
-            src, delayed, final = self.to_src()
-        for child in self.children.values():
-            o, f = child.render()
-            src += o
-            final += f
-        return src + delayed, final
+            src, delayed, lines = self.to_src()
+            if lines:
+                final.append(to_source(lines))
+        return self, src, delayed, final, iter(self.children.values())
+
+    def _render_function(
+        self, body: t.List[Line], final: t.List[str]
+    ) -> t.Tuple[t.List[Line], t.List[str]]:
+        """
+        When the node is rendered into its own function, everything rendered
+        so far becomes the body of that function, and only a call to it is
+        left behind.
+
+        The body never refers to a RouteGroup directly, but to the leaves
+        table that it is called with. Structurally identical subtrees (for
+        example /v1/... and /v2/...) therefore render an identical body, and
+        are emitted only once as a function that is shared by all of them.
+        """
+        key = "".join(
+            str(line)
+            for line in body
+            if line.src and not line.src.startswith("#")
+        )
+        functions = self.router.tree.functions
+        definition: t.List[str] = []
+        if key not in functions:
+            functions[key] = self.function
+            header = [
+                Line("", 0),
+                Line(f"def {self.function}(leaves, {self.SIGNATURE}):", 0),
+            ]
+            definition = [to_source(chain(header, body))]
+        self.function = functions[key]
+
+        # Every table is assigned on its own, and the table of the function
+        # that the node is called from refers to it by name. So no table is
+        # any bigger than the function that it belongs to, no matter how
+        # many routes are below it.
+        trailing = "," if len(self.leaves) == 1 else ""
+        self.table = f"({', '.join(self.leaves)}{trailing})"
+        name = f"leaves_{self.ident.replace('.', '_')}"
+        final = final + [str(Line(f"{name} = {self.table}", 0))]
+        scope = self.parent.scope if self.parent else None
+        leaves = f"leaves[{scope.add_leaf(name)}]" if scope else name
+
+        return self._inject_call(leaves), definition + final
+
+    @property
+    def scope(self) -> t.Optional["Node"]:
+        """
+        The node whose function this node is rendered into, if any
+        """
+        node: t.Optional[Node] = self
+        while node and not node.function:
+            node = node.parent
+        return node
+
+    def add_leaf(self, leaf: str) -> int:
+        """
+        Add to the leaves table of the node's function, and return the
+        index to look it up with
+        """
+        self.leaves.append(leaf)
+        return len(self.leaves) - 1
 
     def to_src(self) -> t.Tuple[t.List[Line], t.List[Line], t.List[Line]]:
         siblings = self.parent.children if self.parent else {}
@@ -115,11 +249,15 @@ class Node:
         if not self.first:
             first_sibling = next(iter(siblings.values()))
 
-        self.base_indent = (
-            bool(self.level >= 1 or self.first) + self.parent.base_indent
-            if self.parent
-            else 0
-        )
+        if self.function:
+            # The first level of indentation inside of its own function
+            self.base_indent = 1
+        else:
+            self.base_indent = (
+                bool(self.level >= 1 or self.first) + self.parent.base_indent
+                if self.parent
+                else 0
+            )
 
         indent = self.base_indent
 
@@ -181,19 +319,28 @@ class Node:
 
             self.equality_check |= bool(len_check)
 
-            src.append(
-                Line(
-                    f'{if_stmt} parts[{idx}] == "{self.part}"{len_check}:'
-                    "  # CHECK 4",
-                    indent,
+            if not self.function:
+                src.append(
+                    Line(
+                        f'{if_stmt} parts[{idx}] == "{self.part}"{len_check}:'
+                        "  # CHECK 4",
+                        indent,
+                    )
                 )
-            )
-            self.base_indent += 1
+                self.base_indent += 1
+            elif len_check:
+                # The caller already checked the segment before calling
+                # the function, which keeps the function body reusable
+                src.append(
+                    Line(f"{if_stmt} num == {self.level}:  # CHECK 4", indent)
+                )
+                self.base_indent += 1
+            else:
+                return_bump = False
 
         # Get ready to return some handlers
         if self.groups:
             return_indent = indent + return_bump
-            route_idx: t.Union[int, str] = 0
             location = delayed
 
             # Do any missing equality_check
@@ -218,48 +365,164 @@ class Node:
                 )
                 return_indent += 1
 
-            for group in sorted(self.groups, key=self._group_sorting):
-                group_bump = 0
+            self._inject_groups(location, return_indent)
 
-                # If the route had some requirements, let's make sure we check
-                # them in the source
-                if group.requirements:
-                    route_idx = "route_idx"
-                    self._inject_requirements(
-                        location, return_indent + group_bump, group
-                    )
+        return src, delayed, final
 
-                # This is for any inline regex routes. It sould not include,
-                # path or path-like routes.
-                if group.regex:
-                    self._inject_regex(
-                        location, return_indent + group_bump, group
-                    )
-                    group_bump += 1
-
-                # Since routes are grouped, we need to know which to select
-                # Inside the compiled source, we keep track so we know which
-                # handler to assign this to
-                if route_idx == 0 and len(group.routes) > 1:
-                    route_idx = "route_idx"
-                    self._inject_method_check(
-                        location, return_indent + group_bump, group
-                    )
+    def to_case(self) -> t.List[Line]:
+        """
+        Render the node as a ``case`` clause that matches the whole path up
+        to the node. Segments are matched by the sequence pattern, and any
+        casting happens in its guard so that a failure moves on to the next
+        case.
+        """
+        patterns: t.List[str] = []
+        guards: t.List[str] = []
+        body: t.List[Line] = []
+        nodes: t.List[Node] = []
+        node: t.Optional[Node] = self
+        while node and not node.root:
+            nodes.insert(0, node)
+            node = node.parent
 
-                # The return.kingdom
-                self._inject_return(
-                    location, return_indent + group_bump, route_idx, group
+        for node in nodes:
+            idx = node.level - 1
+            capture = f"p{idx}"
+            matches = "basket['__matches__']"
+            if not node.dynamic:
+                patterns.append(repr(node.part))
+                continue
+
+            param = node.param
+            if param.regex:
+                pattern = param.pattern
+                matcher_idx = self.router._matcher_idx(pattern.pattern)
+                value = "group(1)" if pattern.groups else "group()"
+                guards.append(
+                    f"(match_{idx} := router.matchers[{matcher_idx}]"
+                    f".match({capture}))"
+                )
+                body.append(
+                    Line(f"{matches}[{idx}] = match_{idx}.{value}", 3)
+                )
+            elif isinstance(param, AlternationParamInfo):
+                allowed = " | ".join(map(repr, sorted(param.ctx.allowed)))
+                capture = f"{allowed} as {capture}"
+                body.append(Line(f"{matches}[{idx}] = p{idx}", 3))
+            elif isinstance(param, ExtParamInfo):
+                ctx = param.ctx
+                allowed = ", ".join(map(repr, sorted(ctx.allowed)))
+                guards.append(
+                    f"ext_segment({matches}, {idx}, {capture}, "
+                    f"{ctx.allowed_sub_count}, "
+                    f"{f'{{{allowed}}}' if allowed else None}, "
+                    f"{ctx.cast.__name__ if ctx.cast else None}, "
+                    f"{node.unquote})"
                 )
+            else:
+                unquote = node.unquote and self.router.tree.cast_as_str(
+                    param.cast
+                )
+                guards.append(
+                    f"cast_segment({matches}, {idx}, "
+                    f"{param.cast.__name__}, {capture}, {unquote})"
+                )
+            patterns.append(capture)
 
-        return src, delayed, final
+        guard = f" if {' and '.join(guards)}" if guards else ""
+        lines = [
+            Line("", 2),
+            Line(f"case [{', '.join(patterns)}]{guard}:", 2),
+            Line(f"# node={self.ident} // part={self.part}", 3),
+            *body,
+        ]
+        self._inject_groups(lines, 3)
+        return lines
+
+    def _inject_groups(self, location, indent):
+        """
+        Select the route from the groups that terminate on the node, and
+        return it
+        """
+        route_idx: t.Union[int, str] = 0
+        for group in sorted(self.groups, key=self._group_sorting):
+            # If the route had some requirements, let's make sure we check
+            # them in the source
+            if group.requirements:
+                route_idx = "route_idx"
+                self._inject_requirements(location, indent, group)
+
+            # Since routes are grouped, we need to know which to select
+            # Inside the compiled source, we keep track so we know which
+            # handler to assign this to
+            if route_idx == 0 and len(group.routes) > 1:
+                route_idx = "route_idx"
+                self._inject_method_check(location, indent, group)
+
+            # The return.kingdom
+            self._inject_return(location, indent, route_idx, group)
+
+    def _inject_call(self, leaves: str) -> t.List[Line]:
+        """
+        Call the function that the node was rendered into, and return its
+        result if it found a match
+        """
+        indent = self.parent.base_indent + 1
+        lines = [
+            Line("", indent),
+            Line(f"# node={self.ident} // part={self.part}", indent),
+        ]
+        if not self.dynamic:
+            idx = self.level - 1
+            lines.append(
+                Line(
+                    f'if num > {idx} and parts[{idx}] == "{self.part}":',
+                    indent,
+                )
+            )
+            indent += 1
+        lines.extend(
+            [
+                Line(
+                    f"found = {self.function}({leaves}, {self.SIGNATURE})",
+                    indent,
+                ),
+                Line("if found:", indent),
+                Line("return found", indent + 1),
+            ]
+        )
+        return lines
 
     def add_child(self, child: "Node") -> None:
         self._children[child.part] = child
+        self._clear_depth()
+
+    def remove_child(self, part: str) -> t.Optional["Node"]:
+        child = self._children.pop(part, None)
+        self.children.pop(part, None)
+        self._clear_depth()
+        return child
+
+    def _clear_depth(self) -> None:
+        node: t.Optional[Node] = self
+        while node is not None and node._depth is not None:
+            node._depth = None
+            node = node.parent
 
     def _inject_param_check(self, location, indent, idx):
         """
         Try and cast relevant path segments.
         """
+        if self.param.regex:
+            self._inject_regex(location, indent, idx)
+            return
+        if isinstance(self.param, AlternationParamInfo):
+            self._inject_alternation(location, indent, idx)
+            return
+        if isinstance(self.param, ExtParamInfo):
+            self._inject_ext(location, indent, idx)
+            return
+
         lines = [
             Line("try:", indent),
             Line(
@@ -271,7 +534,7 @@ class Node:
             Line("pass", indent + 1),
             Line("else:", indent),
         ]
-        if self.unquote and self._cast_as_str(self.param.cast):
+        if self.unquote and self.router.tree.cast_as_str(self.param.cast):
             lines.append(
                 Line(
                     f"basket['__matches__'][{idx}] = "
@@ -283,6 +546,65 @@ class Node:
 
         location.extend(lines)
 
+    def _inject_alternation(self, location, indent, idx):
+        """
+        Params that are a plain alternation of literals (eg. <lang:en|fr>)
+        are matched with a set membership test. The set literal is compiled
+        by Python into a constant frozenset.
+        """
+        allowed = ", ".join(map(repr, sorted(self.param.ctx.allowed)))
+        location.extend(
+            [
+                Line(f"if parts[{idx}] in {{{allowed}}}:", indent),
+                Line(
+                    f"basket['__matches__'][{idx}] = parts[{idx}]",
+                    indent + 1,
+                ),
+            ]
+        )
+        self.base_indent += 1
+
+    def _inject_ext(self, location, indent, idx):
+        """
+        Split a filename segment, and validate its extension and filename
+        type so that a mismatch can fall through to any sibling node.
+        """
+        ctx = self.param.ctx
+        filename = "unquote(filename)" if self.unquote else "filename"
+        if ctx.cast:
+            filename = f"{ctx.cast.__name__}({filename})"
+        lines = [
+            Line("try:", indent),
+            Line(
+                "filename, extension = "
+                f"split_ext(parts[{idx}], {ctx.allowed_sub_count})",
+                indent + 1,
+            ),
+        ]
+        if ctx.allowed:
+            allowed = ", ".join(map(repr, sorted(ctx.allowed)))
+            lines.extend(
+                [
+                    Line(f"if extension not in {{{allowed}}}:", indent + 1),
+                    Line("raise ValueError", indent + 2),
+                ]
+            )
+        lines.extend(
+            [
+                Line(
+                    f"basket['__matches__'][{idx}] = "
+                    f"({filename}, extension)",
+                    indent + 1,
+                ),
+                Line("except ValueError:", indent),
+                Line("pass", indent + 1),
+                Line("else:", indent),
+            ]
+        )
+        self.base_indent += 1
+
+        location.extend(lines)
+
     @staticmethod
     def _cast_as_str(cast) -> bool:
         return_type_hint = t.get_type_hints(cast).get("return")
@@ -317,16 +639,14 @@ class Node:
         """
         routes = "regex_routes" if group.regex else "dynamic_routes"
         route_return = "" if group.router.stacking else f"[{route_idx}]"
+        leaf = f"router.{routes}[{group.segments}]"
+        scope = self.scope
+        if scope:
+            leaf = f"leaves[{scope.add_leaf(leaf)}]"
         location.extend(
             [
                 Line(f"# Return {self.ident}", indent),
-                Line(
-                    (
-                        f"return router.{routes}[{group.segments}]"
-                        f"{route_return}, basket"
-                    ),
-                    indent,
-                ),
+                Line(f"return {leaf}{route_return}, basket", indent),
             ]
         )
 
@@ -357,37 +677,47 @@ class Node:
             ]
         )
 
-    def _inject_regex(self, location, indent, group):
+    def _inject_regex(self, location, indent, idx):
         """
-        For any path matching that happens in the course of the tree (anything
-        that has a path matching--<path:path>--or similar matching with regex
-        delimiter)
+        For any inline regex params (excluding path matching--<path:path>--or
+        similar matching with regex delimiter), match the compiled segment
+        pattern against the single path segment. When the pattern has a
+        group, only the grouped value is kept.
         """
+        pattern = self.param.pattern
+        matcher_idx = self.router._matcher_idx(pattern.pattern)
+        value = "match.group(1)" if pattern.groups else "match.group()"
         location.extend(
             [
                 Line(
-                    (
-                        "match = router.matchers"
-                        f"[{group.pattern_idx}].match(path)"
-                    ),
+                    f"match = router.matchers[{matcher_idx}]"
+                    f".match(parts[{idx}])",
                     indent,
                 ),
                 Line("if match:", indent),
                 Line(
-                    "basket['__params__'] = match.groupdict()",
+                    f"basket['__matches__'][{idx}] = {value}",
                     indent + 1,
                 ),
             ]
         )
+        self.base_indent += 1
 
-    def _sorting(self, item) -> t.Tuple[bool, bool, int, int, int, bool, str]:
+    def _sorting(self, item) -> t.Tuple[bool, bool, int, int, int, int, str]:
         """
         Primarily use to sort nodes to determine the order of the nested tree
         """
         key, child = item
         type_ = 0
+        constrained = int(
+            bool(child.groups and any(group.regex for group in child.groups))
+        )
         if child.dynamic:
             type_ = child.param.priority
+            if isinstance(child.param, ExtParamInfo):
+                constrained += bool(
+                    child.param.ctx.allowed or child.param.ctx.cast
+                )
 
         return (
             bool(child.groups),
@@ -395,9 +725,7 @@ class Node:
             type_ * -1,
             child.depth * -1,
             len(child._children),
-            not bool(
-                child.groups and any(group.regex for group in child.groups)
-            ),
+            constrained * -1,
             key,
         )
 
@@ -413,22 +741,26 @@ class Node:
                 key = segment[1:-1]
                 if ":" in key:
                     key, param_type = key.split(":", 1)
-                    try:
-                        type_ = list(self.router.regex_types.keys()).index(
-                            param_type
-                        )
-                    except ValueError:
-                        type_ = len(list(self.router.regex_types.keys()))
+                    type_ = self.router.regex_type_index.get(
+                        param_type, len(self.router.regex_type_index)
+                    )
             return type_ * -1
 
         segments = tuple(map(get_type, item.parts))
         return segments
 
     @property
-    def depth(self):
-        if not self._children:
-            return self.level
-        return max(child.depth for child in self._children.values())
+    def depth(self) -> int:
+        """
+        The deepest level of any node in the subtree. It is cached until
+        another child is added anywhere beneath the node.
+        """
+        if self._depth is None:
+            self._depth = max(
+                (child.depth for child in self._children.values()),
+                default=self.level,
+            )
+        return self._depth
 
 
 class Tree:
@@ -436,6 +768,11 @@ class Tree:
         self.root = Node(root=True, router=router)
         self.root.level = 0
         self.router = router
+        self.split_depth = 0
+        self.split_size = 0
+        self.dispatch = False
+        self.functions: t.Dict[str, str] = {}
+        self._str_casts: t.Dict[t.Callable[..., t.Any], bool] = {}
 
     def generate(self, groups: t.Iterable[RouteGroup]) -> None:
         """
@@ -453,7 +790,7 @@ class Tree:
                         part
                     ) and not REGEX_PARAM_NAME_EXT.match(part):
                         raise ValueError(f"Invalid declaration: {part}")
-                    part = f"__dynamic__:{group.params[level].label}"
+                    part = self.key(group, level)
                     param = group.params[level]
                 if part not in current._children:
                     child = Node(
@@ -470,15 +807,289 @@ class Tree:
 
             current.groups.append(group)
 
+    @staticmethod
+    def key(group: RouteGroup, level: int = 0) -> str:
+        """
+        The key of the node that the group passes through at the level
+        """
+        part = group.parts[level]
+        if part.startswith("<"):
+            return f"__dynamic__:{group.params[level].key}"
+        return part
+
+    def rebuild(
+        self,
+        groups: t.Dict[str, t.List[RouteGroup]],
+        profile: t.Optional[RouteProfile] = None,
+        cold: t.Optional[t.Set[str]] = None,
+    ) -> t.List[Node]:
+        """
+        Replace the top level nodes for each of the keys (and everything
+        below them) with ones that are generated from their groups, and put
+        the top level nodes back in order. Returns the new nodes, which is
+        none for the keys that have no groups left.
+        """
+        root = self.root
+        for key in groups:
+            root.remove_child(key)
+        for key_groups in groups.values():
+            self.generate(key_groups)
+
+        nodes = [root._children[k] for k in groups if k in root._children]
+        for node in nodes:
+            if profile:
+                self._weigh(node, profile)
+            if cold:
+                self._chill(node, cold)
+        root._order_children()
+        for node in nodes:
+            node.finalize_children()
+        return nodes
+
+    @staticmethod
+    def groups_below(node: Node) -> t.Iterator[RouteGroup]:
+        """
+        The groups that terminate on the node, or on any node below it
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.groups
+            stack.extend(node._children.values())
+
+    def cast_as_str(self, cast: t.Callable[..., t.Any]) -> bool:
+        """
+        Whether the cast returns a str, which is looked up once per cast for
+        as long as the tree is kept (until the router is reset)
+        """
+        try:
+            return self._str_casts[cast]
+        except KeyError:
+            as_str = self._str_casts[cast] = Node._cast_as_str(cast)
+        except TypeError:
+            # An unhashable cast is looked up every time
+            as_str = Node._cast_as_str(cast)
+        return as_str
+
     def display(self) -> None:
         """
         Debug tool to output visual of the tree
         """
         self.root.display()
 
-    def render(self) -> t.List[Line]:
-        o, f = self.root.render()
-        return o + f
+    def render(self) -> t.Tuple[t.List[Line], t.List[str]]:
+        """
+        Render the tree into the lines that belong to the body of
+        ``find_route``, and the source of each function that nodes were
+        split out into.
+        """
+        if not self.plan():
+            return self.root.render()
+
+        # Every top level node is rendered into its own function, and
+        # find_route only needs to look up which of them to call based upon
+        # the first segment of the path
+        functions = self.render_subtrees(self.root.children.values())
+        functions.append(to_source(self._dispatch_table()))
+        return self._inject_dispatch(), functions
+
+    def plan(self) -> bool:
+        """
+        Decide which nodes are rendered into functions of their own, and
+        return whether ``find_route`` dispatches to the top level nodes
+        """
+        self.functions = {}
+        size, _ = self._split(self.root)
+        self.dispatch = bool(self.split_size and size > self.split_size)
+        return self.dispatch
+
+    def render_subtrees(self, nodes: t.Iterable[Node]) -> t.List[str]:
+        """
+        Render each of the top level nodes into its own function, and
+        return their source
+        """
+        functions: t.List[str] = []
+        for node in nodes:
+            node.function = self._function_name(node)
+            _, definition = node.render()
+            functions += definition
+        return functions
+
+    def render_subtree(self, node: Node) -> t.List[str]:
+        """
+        Render a top level node into its own function, the same as when the
+        whole tree is dispatched on the first segment, and return its source
+        """
+        self.functions = {}
+        self._split(node)
+        return self.render_subtrees([node])
+
+    def matcher_sources(self) -> t.Iterator[str]:
+        """
+        The regular expressions of the nodes, in the order that rendering
+        registers them
+        """
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.dynamic and node.param.regex:
+                yield node.param.pattern.pattern
+            stack.extend(reversed(list(node.children.values())))
+
+    def render_match(self) -> t.List[Line]:
+        """
+        Render the tree as a single ``match`` statement over the parts of the
+        path, with a ``case`` for every node that routes terminate on. The
+        cases are in the order that the nested ``if`` blocks would reach
+        them, so the first case to match is the same route that the tree
+        would find. Requires Python 3.10+.
+        """
+        self.functions = {}
+        self.dispatch = False
+        cases = [
+            line
+            for node in self._terminals(self.root)
+            for line in node.to_case()
+        ]
+        return [Line("match parts:", 1), *cases] if cases else []
+
+    def _terminals(self, node: Node) -> t.Iterator[Node]:
+        for child in node.children.values():
+            yield from self._terminals(child)
+        if node.groups:
+            yield node
+
+    def _split(self, node: Node) -> t.Tuple[int, int]:
+        """
+        Decide which nodes are rendered into a function of their own, and
+        return the number of nodes in the subtree, and how many of them are
+        rendered inline (in the same function as the node). A node is split
+        out every ``split_depth`` levels, which keeps the nesting of the
+        generated source shallow enough for Python to compile no matter how
+        deep the routes are. It is also split out when its subtree holds
+        more than ``split_size`` nodes, and the largest of its siblings are
+        split out while more than ``split_size`` nodes would be rendered
+        inline, which keeps each function small no matter how many siblings
+        there are. Subtrees that only hold cold routes are always split
+        out, so that they are only left behind as a call in the function
+        that is usually run.
+        """
+        size = inline = 1
+        candidates: t.List[t.Tuple[int, Node]] = []
+        for child in node.children.values():
+            child_size, child_inline = self._split(child)
+            size += child_size
+            if (child.cold and not node.cold) or (
+                child.level > 1
+                and (
+                    (
+                        self.split_depth
+                        and (child.level - 1) % self.split_depth == 0
+                    )
+                    or (self.split_size and child_size > self.split_size)
+                )
+            ):
+                child.function = self._function_name(child)
+                continue
+            inline += child_inline
+            if child.level > 1 and child_inline > 1:
+                candidates.append((child_inline, child))
+
+        if self.split_size and inline > self.split_size:
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+            for child_inline, child in candidates:
+                if inline <= self.split_size:
+                    break
+                child.function = self._function_name(child)
+                inline -= child_inline - 1
+        return size, inline
 
-    def finalize(self):
+    @staticmethod
+    def _function_name(node: Node) -> str:
+        return f"find_route_{node.ident.replace('.', '_')}"
+
+    def _inject_dispatch(self) -> t.List[Line]:
+        return [
+            Line(
+                "for subtree, leaves in subtrees.get(parts[0], fallback):", 1
+            ),
+            Line(f"found = subtree(leaves, {Node.SIGNATURE})", 2),
+            Line("if found:", 2),
+            Line("return found", 3),
+        ]
+
+    def _dispatch_table(self) -> t.List[Line]:
+        """
+        The functions to try for each first segment of the path. Static
+        nodes can only ever match their own segment, but dynamic nodes are
+        tried for all of them. The original order of the nodes is kept.
+        """
+        def as_tuple(nodes: t.Iterable[Node]) -> str:
+            functions = [
+                f"({node.function}, leaves_{node.ident})" for node in nodes
+            ]
+            trailing = "," if len(functions) == 1 else ""
+            return f"({', '.join(functions)}{trailing})"
+
+        subtrees, fallback = self.dispatch_nodes()
+        lines = [Line("", 0), Line("subtrees = {", 0)]
+        for part, nodes in subtrees.items():
+            lines.append(Line(f"{part!r}: {as_tuple(nodes)},", 1))
+        lines.append(Line("}", 0))
+        lines.append(Line(f"fallback = {as_tuple(fallback)}", 0))
+        return lines
+
+    def dispatch_nodes(
+        self,
+    ) -> t.Tuple[t.Dict[str, t.List[Node]], t.List[Node]]:
+        """
+        The top level nodes to try for each first segment of the path, and
+        the ones to try for any other segment
+        """
+        children = list(self.root.children.values())
+        positions = [i for i, n in enumerate(children) if n.dynamic]
+        fallback = [children[i] for i in positions]
+        subtrees = {}
+        for position, child in enumerate(children):
+            if not child.dynamic:
+                split = bisect(positions, position)
+                subtrees[child.part] = [
+                    *fallback[:split],
+                    child,
+                    *fallback[split:],
+                ]
+        return subtrees, fallback
+
+    def finalize(
+        self,
+        profile: t.Optional[RouteProfile] = None,
+        cold: t.Optional[t.Set[str]] = None,
+    ) -> None:
+        if profile:
+            self._weigh(self.root, profile)
+        if cold:
+            self._chill(self.root, cold)
+            self.root.cold = False
         self.root.finalize_children()
+
+    def _weigh(self, node: Node, profile: RouteProfile) -> int:
+        """
+        Set the hits of every node to the hits of all of the routes that
+        terminate on or below it
+        """
+        node.hits = sum(profile.weight(group.path) for group in node.groups)
+        for child in node._children.values():
+            node.hits += self._weigh(child, profile)
+        return node.hits
+
+    def _chill(self, node: Node, cold: t.Set[str]) -> bool:
+        """
+        Mark every node whose routes (on or below it) are all cold
+        """
+        children = [
+            self._chill(child, cold) for child in node._children.values()
+        ]
+        node.cold = all(children) and all(
+            group.path in cold for group in node.groups
+        )
+        return node.cold
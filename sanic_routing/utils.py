@@ -1,5 +1,6 @@
-import re
+import typing as t
 
+from functools import lru_cache
 from urllib.parse import quote, unquote
 
 from sanic_routing.exceptions import InvalidUsage
@@ -49,6 +50,52 @@ def parse_parameter_basket(route, basket, raw_path=None):
     return params, raw_path
 
 
+def split_path(path: str, delimiter: str = "/") -> t.List[str]:
+    r"""
+    Split a declared path on the delimiter, except where the delimiter is
+    part of a param (for example inside of its regex). This is the same as
+    splitting on ``{delimiter}(?=[^>]*(?:<(?<!\?<)|$))``: a delimiter splits
+    the path when the next ``<`` that opens a param, or the end of the path,
+    comes before the next ``>``. Most paths have no regex, and are split
+    without looking any further.
+    """
+    pieces = path.split(delimiter)
+    if ">" not in path or len(pieces) == 1:
+        return pieces
+
+    # Work back from the end, joining any pieces that are inside of a param
+    parts = [pieces[-1]]
+    splits = _opens_param(pieces[-1], True)
+    for piece in reversed(pieces[:-1]):
+        if splits:
+            parts.append(piece)
+        else:
+            parts[-1] = f"{piece}{delimiter}{parts[-1]}"
+        splits = _opens_param(piece, splits)
+    parts.reverse()
+    return parts
+
+
+def _opens_param(piece: str, default: bool) -> bool:
+    """
+    Whether a ``<`` that opens a param comes before any ``>`` in the piece,
+    or the default when the piece has neither
+    """
+    close = piece.find(">")
+    idx = piece.find("<")
+    while idx > 0 and piece[idx - 1] == "?":
+        idx = piece.find("<", idx + 1)
+    if idx == -1:
+        return default and close == -1
+    return close == -1 or idx < close
+
+
+# Adding a route normalizes its path a number of times, and generated routes
+# tend to repeat the same paths (once per method), so the results are cached.
+# The caches are shared by every router in the process: each result depends
+# on nothing but the arguments (the delimiter being one of them) and cannot
+# be changed, and only the paths that routes are added with are cached.
+@lru_cache(maxsize=4096)
 def path_to_parts(path, delimiter="/"):
     r"""
     OK > /foo/<id:int>/bar/<name:[A-z]+>
@@ -59,39 +106,44 @@ def path_to_parts(path, delimiter="/"):
     NOT OK > /foo/<ext:file\.(?P<ext>txt)d>/<ext:[a-z]>
     """
     path = unquote(path.lstrip(delimiter))
-    delimiter = re.escape(delimiter)
     return tuple(
-        part if part.startswith("<") else quote(part)
-        for part in re.split(rf"{delimiter}(?=[^>]*(?:<(?<!\?<)|$))", path)
+        part if part.startswith("<") else _quote(part)
+        for part in split_path(path, delimiter)
     )
 
 
+@lru_cache(maxsize=4096)
 def parts_to_path(parts, delimiter="/"):
-    path = []
-    for part in parts:
-        if part.startswith("<"):
-            try:
-                match = REGEX_PARAM_NAME.match(part)
-                param_type = ""
-                if match.group(2):
-                    param_type = f":{match.group(2)}"
-                path.append(f"<{match.group(1)}{param_type}>")
-            except AttributeError:
-                try:
-                    match = REGEX_PARAM_NAME_EXT.match(part)
-                    filename_type = ""
-                    extension_type = ""
-                    if match.group(2):
-                        filename_type = f"={match.group(2)}"
-                    if match.group(3):
-                        extension_type = f"={match.group(3)}"
-                    segment = (
-                        f"<{match.group(1)}{filename_type}:"
-                        f"ext{extension_type}>"
-                    )
-                    path.append(segment)
-                except AttributeError:
-                    raise InvalidUsage(f"Invalid declaration: {part}")
-        else:
-            path.append(part)
-    return delimiter.join(path)
+    return delimiter.join(
+        _normalize_param(part) if part.startswith("<") else part
+        for part in parts
+    )
+
+
+# Static segments (eg. /api/v1) and params (eg. <id:int>) are repeated across
+# many declarations, so they are each only normalized once (by every router)
+@lru_cache(maxsize=4096)
+def _quote(part: str) -> str:
+    return quote(part)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_param(part: str) -> str:
+    match = REGEX_PARAM_NAME.match(part)
+    if match:
+        param_type = ""
+        if match.group(2):
+            param_type = f":{match.group(2)}"
+        return f"<{match.group(1)}{param_type}>"
+
+    match = REGEX_PARAM_NAME_EXT.match(part)
+    if match:
+        filename_type = ""
+        extension_type = ""
+        if match.group(2):
+            filename_type = f"={match.group(2)}"
+        if match.group(3):
+            extension_type = f"={match.group(3)}"
+        return f"<{match.group(1)}{filename_type}:ext{extension_type}>"
+
+    raise InvalidUsage(f"Invalid declaration: {part}")
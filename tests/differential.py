@@ -0,0 +1,83 @@
+"""
+Routes and paths to resolve against routers that are built in different
+ways, which should all match the same routes
+"""
+
+from sanic_routing.exceptions import NoMethod, NotFound
+
+
+ROUTES = {
+    "nested": (
+        "/a/b/<c:int>/d/e",
+        "/a/b/<c:int>/f",
+        "/a/b/<c:int>",
+        "/a/<x>/c",
+        "/<x>/<y>/<z>/d",
+        "/c",
+    ),
+    "siblings": (
+        "/v1/users/<id:int>",
+        "/v1/users/<id:int>/posts",
+        "/v1/orgs/<org:slug>",
+        "/v2/users/<id:uuid>",
+        "/v2/users/<name:alpha>",
+        "/v2/files/<file:ext=css|js>",
+        "/v2/files/<file:ext>",
+        "/v3/<name:[a-z]+>/<file:ext>",
+        "/v3/<name:[a-z]+>/<file:ext=css|js>",
+        "/<lang:en|fr>/about",
+        "/<page>",
+    ),
+    "regex": (
+        "/r/<a:[0-9]+>",
+        "/r/<a:[a-z]+>/<b:int>",
+        "/r/<a:[a-z]+>/x",
+        "/path/<p:path>",
+        "/path/<p:path>/end",
+        "/<year:ymd>/<slug:slug>",
+    ),
+}
+PATHS = (
+    "/",
+    "/c",
+    "/a/b/1",
+    "/a/b/x",
+    "/a/b/1/f",
+    "/a/b/1/d/e",
+    "/a/b/1/d",
+    "/a/q/c",
+    "/a/q/c/d",
+    "/x/q/c/d",
+    "/v1/users/1",
+    "/v1/users/x",
+    "/v1/users/1/posts",
+    "/v1/orgs/some-org",
+    "/v1/orgs/Some_Org",
+    "/v2/users/7c3e5b1e-7cfc-4b3a-ae84-7ac7c1cd1d0f",
+    "/v2/users/alice",
+    "/v2/users/a1",
+    "/v2/files/site.css",
+    "/v2/files/site.txt",
+    "/v2/files/site",
+    "/v3/abc/site.css",
+    "/v3/abc/site.txt",
+    "/v3/ab1/site.txt",
+    "/en/about",
+    "/de/about",
+    "/r/123",
+    "/r/abc/1",
+    "/r/abc/x",
+    "/r/abc/y",
+    "/path/to/some/thing",
+    "/path/to/end",
+    "/2024-01-31/some-post",
+    "/2024-13-31/some-post",
+)
+
+
+def resolve(router, path, method):
+    try:
+        route, _, params = router.get(path, method)
+    except (NotFound, NoMethod) as e:
+        return e.__class__
+    return route.path, params
@@ -393,3 +393,104 @@ def test_invalid_def(handler):
 
     with pytest.raises(InvalidUsage):
         router.finalize()
+
+
+def test_alternation_is_not_regex(handler):
+    router = Router()
+
+    router.add("/<lang:en|fr|de>/about", handler)
+    router.finalize()
+
+    assert not router.regex_routes
+    assert len(router.dynamic_routes) == 1
+    assert "{'de', 'en', 'fr'}" in router.find_route_src
+
+    _, handler, params = router.get("/fr/about", "BASE")
+    assert params == {"lang": "fr"}
+
+    with pytest.raises(NotFound):
+        router.get("/es/about", "BASE")
+
+
+def test_alternation_before_string():
+    def handler1():
+        return "handler1"
+
+    def handler2():
+        return "handler2"
+
+    router = Router()
+
+    router.add("/<anystring:str>", handler1)
+    router.add("/<lang:en|fr>", handler2)
+    router.finalize()
+
+    _, handler, params = router.get("/en", "BASE")
+    assert handler() == "handler2"
+    assert params == {"lang": "en"}
+
+    _, handler, params = router.get("/es", "BASE")
+    assert handler() == "handler1"
+    assert params == {"anystring": "es"}
+
+
+def test_ext_mismatch_falls_through_to_sibling():
+    def handler1(**kwargs):
+        return "handler1"
+
+    def handler2(**kwargs):
+        return "handler2"
+
+    def handler3(**kwargs):
+        return "handler3"
+
+    router = Router()
+
+    router.add("/assets/<filename:ext=css|js>", handler1)
+    router.add("/assets/<filename=int:ext=png>", handler2)
+    router.add("/assets/<name>", handler3)
+    router.finalize()
+
+    assert not router.regex_routes
+
+    _, handler, params = router.get("/assets/site.css", "BASE")
+    assert handler() == "handler1"
+    assert params == {"filename": "site", "ext": "css"}
+
+    _, handler, params = router.get("/assets/123.png", "BASE")
+    assert handler() == "handler2"
+    assert params == {"filename": 123, "ext": "png"}
+
+    _, handler, params = router.get("/assets/logo.png", "BASE")
+    assert handler() == "handler3"
+    assert params == {"name": "logo.png"}
+
+    _, handler, params = router.get("/assets/site.txt", "BASE")
+    assert handler() == "handler3"
+    assert params == {"name": "site.txt"}
+
+
+@pytest.mark.parametrize("prefix", ("", "/<dir:[a-z]+>"))
+def test_ext_constrained_before_unconstrained(prefix):
+    def handler1(**kwargs):
+        return "handler1"
+
+    def handler2(**kwargs):
+        return "handler2"
+
+    router = Router()
+
+    router.add(f"{prefix}/<filename:ext>", handler1)
+    router.add(f"{prefix}/<filename:ext=min.js>", handler2)
+    router.finalize()
+
+    path = "/static" if prefix else ""
+    params = {"dir": "static"} if prefix else {}
+
+    _, handler, found = router.get(f"{path}/app.min.js", "BASE")
+    assert handler() == "handler2"
+    assert found == {"filename": "app", "ext": "min.js", **params}
+
+    _, handler, found = router.get(f"{path}/app.js", "BASE")
+    assert handler() == "handler1"
+    assert found == {"filename": "app", "ext": "js", **params}
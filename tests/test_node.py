@@ -18,3 +18,27 @@ def test_nesting(root):
     root.finalize_children()
 
     assert child == root.children["a"]
+
+
+def test_ident_and_depth(root):
+    a = Node(part="a", parent=root)
+    b = Node(part="b", parent=root)
+    c = Node(part="c", parent=b)
+    for parent, child, level in ((root, a, 1), (root, b, 1), (b, c, 2)):
+        parent.add_child(child)
+        child.level = level
+
+    assert root.depth == 2
+    root.finalize_children()
+
+    assert [(n.idx, n.ident) for n in (b, a, c)] == [
+        (1, "1"),
+        (2, "2"),
+        (1, "1.1"),
+    ]
+
+    d = Node(part="d", parent=c)
+    c.add_child(d)
+    d.level = 3
+    assert root.depth == 3
+    assert a.depth == 1
@@ -0,0 +1,122 @@
+import ast
+
+from textwrap import dedent
+
+import pytest
+
+from differential import PATHS, ROUTES, resolve
+
+from sanic_routing import BaseRouter
+from sanic_routing.optimizer import optimize
+
+
+class Router(BaseRouter):
+    def get(self, path, method, extra=None):
+        return self.resolve(path=path, method=method, extra=extra)
+
+
+@pytest.mark.parametrize("split_size", (0, 1))
+@pytest.mark.parametrize("name", tuple(ROUTES))
+def test_optimized_matches_unoptimized(name, split_size):
+    routers = []
+    for do_optimize in (False, True):
+        router = Router()
+        for path in ROUTES[name]:
+            router.add(path, lambda **kwargs: kwargs, methods=["GET"])
+        router.finalize(do_optimize=do_optimize, split_size=split_size)
+        routers.append(router)
+
+    unoptimized, optimized = routers
+    assert optimized.find_route_src_compiled != (
+        unoptimized.find_route_src_compiled
+    )
+    for path in PATHS:
+        for method in ("GET", "POST"):
+            assert resolve(optimized, path, method) == resolve(
+                unoptimized, path, method
+            ), path
+
+
+def run(src, *args):
+    ctx = {}
+    exec(compile(optimize(ast.parse(dedent(src))), "", "exec"), ctx)
+    return ctx["f"](*args)
+
+
+def test_only_identical_conditions_are_merged():
+    src = """
+    def f(num, out):
+        if num == 1:
+            out.append(1)
+        if num == 2:
+            out.append(2)
+        if num == 2:
+            out.append(3)
+        return out
+    """
+    assert run(src, 1, []) == [1]
+    assert run(src, 2, []) == [2, 3]
+    assert run(src, 3, []) == []
+
+    module = optimize(ast.parse(dedent(src)))
+    assert len([n for n in ast.walk(module) if isinstance(n, ast.If)]) == 2
+
+
+def test_conditions_are_not_merged_across_assignments():
+    src = """
+    def f(num, parts):
+        found = None
+        if found is None:
+            found = 1
+        if found is None:
+            found = 2
+        return found
+    """
+    assert run(src, 1, ()) == 1
+
+
+def test_redundant_length_checks_are_removed():
+    src = """
+    def f(path, num, parts):
+        if num > 2:
+            if num > 1 and parts[1] == "a":
+                return 1
+            if num >= 3:
+                return 2
+            if num == 1:
+                return 3
+        elif num > 2:
+            return 4
+        return 5
+    """
+    module = optimize(ast.parse(dedent(src)))
+    compiled = ast.dump(module)
+    assert compiled.count("Compare") == 2
+    assert "value=3" not in compiled
+    assert "value=4" not in compiled
+
+    assert run(src, "/x/a/b", 3, ("x", "a", "b")) == 1
+    assert run(src, "/x/y/z", 3, ("x", "y", "z")) == 2
+    assert run(src, "/x", 1, ("x",)) == 5
+
+
+def test_repeated_segments_are_hoisted():
+    src = """
+    def f(path, num, parts):
+        if num > 2:
+            if parts[2] == "a":
+                return 1
+            if parts[2] == "b":
+                return 2
+        if parts[0] == "c":
+            return 3
+        if parts[0] == "d":
+            return 4
+    """
+    module = optimize(ast.parse(dedent(src)))
+    names = {n.id for n in ast.walk(module) if isinstance(n, ast.Name)}
+    assert "part_2" in names
+    assert "part_0" not in names
+
+    assert run(src, "/x/y/b", 3, ("x", "y", "b")) == 2
+    assert run(src, "/d", 1, ("d",)) == 4
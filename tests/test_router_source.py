@@ -1,6 +1,14 @@
+import ast
+import multiprocessing
+import sys
+import threading
+
 import pytest
 
-from sanic_routing import BaseRouter
+from differential import PATHS, ROUTES, resolve
+
+from sanic_routing import BaseRouter, RouteProfile
+from sanic_routing.exceptions import FinalizationError, NoMethod, NotFound
 
 
 class Router(BaseRouter):
@@ -27,3 +35,600 @@ def test_route_correct_coercion(cascade, lines, not_founds):
 
     assert router.find_route_src.count("\n") == lines
     assert router.find_route_src.count("raise NotFound") == not_founds
+
+
+def test_deep_routes_are_split_into_functions():
+    def handler(**kwargs):
+        return kwargs
+
+    parts = [f"<p{i}:int>" if i % 2 else f"s{i}" for i in range(60)]
+    router = Router()
+    router.add("/" + "/".join(parts), handler)
+    router.add("/" + "/".join(parts[:40]) + "/other", handler)
+    router.finalize()
+
+    assert router.find_route_src.count("\ndef ") == 3
+
+    path = "/" + "/".join(str(i) if i % 2 else f"s{i}" for i in range(60))
+    route, _, params = router.get(path, "BASE")
+    assert route.path == "/".join(parts)
+    assert params == {f"p{i}": i for i in range(1, 60, 2)}
+
+
+def test_split_functions_are_compiled_one_at_a_time(monkeypatch):
+    def handler(**kwargs):
+        return kwargs
+
+    compiled = []
+
+    def record(src, *args):
+        compiled.append(src)
+        return compile(src, *args)
+
+    router = Router()
+    for i in range(4):
+        router.add(f"/a{i}/<b:int>/c/<d:int>", handler, name=f"r{i}")
+    monkeypatch.setattr(
+        "sanic_routing.router.compile", record, raising=False
+    )
+    router.finalize(split_size=2)
+
+    assert len(compiled) > 1
+    assert "".join(compiled) == router.find_route_src
+    assert all(src.count("\ndef ") <= 1 for src in compiled)
+    assert router.get("/a3/1/c/2", "BASE")[0].name == "r3"
+
+
+def test_deep_routes_without_splitting_fail_to_compile():
+    router = Router()
+    router.add("/" + "/".join(f"s{i}" for i in range(60)) + "/<x>", print)
+
+    with pytest.raises(FinalizationError):
+        router.finalize(split_depth=0)
+
+
+@pytest.mark.parametrize("split_depth", (1, 2, 3))
+def test_split_depth_does_not_change_matching(split_depth):
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/b/<c:int>/d/e", handler, name="one")
+    router.add("/a/b/<c:int>/f", handler, name="two")
+    router.add("/a/b/<c:int>", handler, name="three")
+    router.add("/a/<x>/c", handler, name="four")
+    router.finalize(split_depth=split_depth)
+
+    assert router.get("/a/b/1/d/e", "BASE")[0].name == "one"
+    assert router.get("/a/b/1/f", "BASE")[0].name == "two"
+    assert router.get("/a/b/1", "BASE")[0].name == "three"
+    assert router.get("/a/b/c", "BASE")[0].name == "four"
+
+
+@pytest.mark.parametrize("split_size", (0, 1, 3))
+def test_dispatch_on_first_segment(split_size):
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/b/<c:int>", handler, name="one")
+    router.add("/<x:int>/b", handler, name="two")
+    router.add("/b/<c:int>", handler, name="three")
+    router.add("/a/<x>/c", handler, name="four")
+    router.add("/<x>/<y>/<z>/d", handler, name="five")
+    router.add("/c", handler, name="six")
+    router.finalize(split_size=split_size)
+
+    assert ("subtrees.get(parts[0]" in router.find_route_src) is bool(
+        split_size
+    )
+    assert router.get("/a/b/1", "BASE")[0].name == "one"
+    assert router.get("/1/b", "BASE")[0].name == "two"
+    assert router.get("/b/3", "BASE")[0].name == "three"
+    assert router.get("/a/q/c", "BASE")[0].name == "four"
+    assert router.get("/a/q/c/d", "BASE")[0].name == "five"
+    assert router.get("/x/q/c/d", "BASE")[0].name == "five"
+    assert router.get("/c", "BASE")[0].name == "six"
+    with pytest.raises(NotFound):
+        router.get("/x/q/c", "BASE")
+
+
+def test_wide_nodes_are_split_into_functions():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    for idx in range(40):
+        router.add(f"/api/r{idx}/<id:int>/x/<y:int>", handler, name=f"r{idx}")
+    router.add("/other/<id:int>", handler, name="other")
+    router.finalize(split_size=8)
+
+    # No single child is bigger than the split size, but together they are
+    api = router.tree.root.children["api"]
+    assert all(child.function for child in api.children.values())
+    assert len(router.find_route_src.split("\ndef ")) == 4
+
+    # Every table is assigned on its own, and refers to the ones below it
+    assert "\nleaves_1_1 = (" in router.find_route_src
+    assert "\nleaves_1 = (leaves_1_1, leaves_1_2," in router.find_route_src
+    for idx in range(40):
+        route, _, params = router.get(f"/api/r{idx}/1/x/2", "BASE")
+        assert route.name == f"r{idx}"
+        assert params == {"id": 1, "y": 2}
+    assert router.get("/other/3", "BASE")[0].name == "other"
+
+
+def test_identical_subtrees_share_a_function():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    for tenant in ("acme", "globex"):
+        for version in ("v1", "v2", "v3"):
+            prefix = f"/{tenant}/{version}"
+            name = f"{tenant}_{version}"
+            router.add(f"{prefix}/users/<id:int>", handler, name=name)
+            router.add(f"{prefix}/orgs/<org:slug>", handler, name=name)
+    router.finalize(split_size=5)
+
+    assert router.find_route_src.count("\ndef ") == 2
+    for tenant in ("acme", "globex"):
+        for version in ("v1", "v2", "v3"):
+            name = f"{tenant}_{version}"
+            route, _, params = router.get(
+                f"/{tenant}/{version}/users/9", "BASE"
+            )
+            assert route.name == name
+            assert params == {"id": 9}
+            route, _, params = router.get(
+                f"/{tenant}/{version}/orgs/foo", "BASE"
+            )
+            assert route.name == name
+            assert params == {"org": "foo"}
+            with pytest.raises(NotFound):
+                router.get(f"/{tenant}/{version}/users/x", "BASE")
+
+
+def test_source_is_compiled_without_building_the_ast(monkeypatch):
+    def handler(**kwargs):
+        return kwargs
+
+    def parse(*args, **kwargs):
+        raise AssertionError("The AST should not be built")
+
+    router = Router()
+    router.add("/a/<b:int>", handler, name="one")
+    router.add("/<a>/c", handler, name="two")
+    with monkeypatch.context() as m:
+        m.setattr(ast, "parse", parse)
+        router.finalize()
+
+    assert router.get("/a/1", "BASE")[0].name == "one"
+    assert router.get("/a/c", "BASE")[0].name == "two"
+    if sys.version_info >= (3, 9):
+        assert router.find_route_src_compiled == ast.unparse(
+            ast.parse(router.find_route_src)
+        )
+
+
+CONFIGS = {
+    "split": {"split_size": 1},
+    "match": {"backend": "match"},
+    "radix": {"backend": "radix"},
+    "tiered": {"backend": "tiered", "compile_threshold": 3},
+    "workers": {"split_size": 1, "workers": 2},
+}
+
+
+@pytest.mark.parametrize("config", tuple(CONFIGS))
+@pytest.mark.parametrize("name", tuple(ROUTES))
+def test_finalize_options_do_not_change_matching(name, config):
+    if config == "match" and sys.version_info < (3, 10):
+        pytest.skip("The match backend requires Python 3.10+")
+
+    routers = []
+    for kwargs in ({}, CONFIGS[config]):
+        router = Router()
+        for path in ROUTES[name]:
+            router.add(path, lambda **kwargs: kwargs, methods=["GET"])
+        router.finalize(**kwargs)
+        routers.append(router)
+
+    expected, router = routers
+    assert router.find_route_src != expected.find_route_src or (
+        router.find_route_src_compiled != expected.find_route_src_compiled
+    )
+    for _ in range(2):
+        for path in PATHS:
+            for method in ("GET", "POST"):
+                assert resolve(router, path, method) == resolve(
+                    expected, path, method
+                ), path
+
+
+def test_workers_render_the_same_functions():
+    routers = []
+    for workers in (1, 3):
+        router = Router()
+        for name in ROUTES:
+            for path in ROUTES[name]:
+                router.add(path, lambda **kwargs: kwargs, methods=["GET"])
+        router.finalize(split_size=1, workers=workers)
+        routers.append(router)
+
+    expected, router = routers
+    assert "subtrees.get(parts[0]" in router.find_route_src
+    assert len(router.matchers) == len(expected.matchers)
+    for path in PATHS:
+        assert resolve(router, path, "GET") == resolve(expected, path, "GET")
+
+
+def test_workers_are_not_forked_beside_other_threads(monkeypatch):
+    import sanic_routing.router as router_module
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Forked while other threads are running")
+
+    def finalize(router):
+        router.finalize(split_size=1, workers=2)
+
+    router = Router()
+    for path in ROUTES["nested"]:
+        router.add(path, lambda **kwargs: kwargs)
+    if "fork" in multiprocessing.get_all_start_methods():
+        assert router._can_fork()
+    monkeypatch.setattr(router_module, "ProcessPoolExecutor", fail)
+
+    # From another thread
+    thread = threading.Thread(target=finalize, args=(router,))
+    thread.start()
+    thread.join()
+    assert router.finalized
+
+    # From the main thread, while another thread is running
+    router.reset()
+    done = threading.Event()
+    thread = threading.Thread(target=done.wait)
+    thread.start()
+    try:
+        finalize(router)
+    finally:
+        done.set()
+        thread.join()
+    assert "subtrees.get(parts[0]" in router.find_route_src
+
+
+def test_workers_must_be_positive():
+    router = Router()
+    router.add("/<foo>", lambda **kwargs: kwargs)
+    with pytest.raises(FinalizationError):
+        router.finalize(workers=0)
+
+
+@pytest.mark.parametrize("name", tuple(ROUTES))
+def test_profile_does_not_change_matching(name):
+    routers = []
+    for _ in range(2):
+        router = Router()
+        for path in ROUTES[name]:
+            router.add(path, lambda **kwargs: kwargs, methods=["GET"])
+        routers.append(router)
+
+    expected, router = routers
+    expected.finalize()
+    expected.profile = RouteProfile()
+    for path in reversed(PATHS):
+        resolve(expected, path, "GET")
+
+    router.finalize(profile=expected.profile)
+    for path in PATHS:
+        for method in ("GET", "POST"):
+            assert resolve(router, path, method) == resolve(
+                expected, path, method
+            ), path
+
+
+def test_profile_orders_hot_static_siblings_first(tmp_path):
+    def handler(**kwargs):
+        return kwargs
+
+    routes = ("/cold/<a>", "/warm/<a>", "/hot/<a>", "/<a>/<b>")
+    router = Router()
+    for path in routes:
+        router.add(path, handler)
+    router.finalize()
+    order = list(router.tree.root.children)
+    assert order[-1].startswith("__dynamic__")
+
+    router.profile = RouteProfile()
+    for path, count in (("/hot/1", 3), ("/warm/1", 2), ("/x/y", 5)):
+        for _ in range(count):
+            router.get(path, "BASE")
+    assert router.profile.hits == {
+        "hot/<a:str>": 3,
+        "warm/<a:str>": 2,
+        "<a:str>/<b:str>": 5,
+    }
+
+    filename = tmp_path / "profile.json"
+    router.profile.save(filename)
+    profile = RouteProfile.load(filename)
+    assert profile.hits == router.profile.hits
+
+    router.reset()
+    router.finalize(profile=profile)
+    assert list(router.tree.root.children) == [
+        "hot",
+        "warm",
+        "cold",
+        order[-1],
+    ]
+    src = router.find_route_src
+    assert src.index('"hot"') < src.index('"warm"') < src.index('"cold"')
+    assert router.get("/cold/1", "BASE")[2] == {"a": "1"}
+    assert router.get("/x/y", "BASE")[2] == {"a": "x", "b": "y"}
+
+
+@pytest.mark.parametrize("name", tuple(ROUTES))
+def test_cold_routes_do_not_change_matching(name):
+    routers = []
+    for _ in range(2):
+        router = Router()
+        for path in ROUTES[name]:
+            router.add(path, lambda **kwargs: kwargs, methods=["GET"])
+        routers.append(router)
+
+    expected, router = routers
+    expected.finalize()
+    router.finalize(cold_routes=ROUTES[name][::2])
+    for path in PATHS:
+        for method in ("GET", "POST"):
+            assert resolve(router, path, method) == resolve(
+                expected, path, method
+            ), path
+
+
+def test_cold_routes_are_split_out():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/admin/<a>/<b>", handler, name="admin")
+    router.add("/legacy/<a:int>", handler, name="legacy")
+    router.add("/users/<a:int>", handler, name="users")
+    router.add("/<a>/<b:int>", handler, name="any")
+    router.finalize(cold_routes=["admin", "/legacy/<a:int>"])
+
+    assert router.tree.root.children["admin"].cold
+    assert router.tree.root.children["legacy"].cold
+    assert not router.tree.root.children["users"].cold
+    assert list(router.tree.root.children)[:3] == ["users", "admin", "legacy"]
+
+    body, *functions = router.find_route_src.split("\ndef ")
+    assert "'users'" in body or '"users"' in body
+    assert "find_route_2(" in body and "find_route_3(" in body
+    assert len(functions) == 2
+    assert "parts[2]" not in body
+
+    assert router.get("/admin/x/y", "BASE")[0].name == "admin"
+    assert router.get("/legacy/1", "BASE")[0].name == "legacy"
+    assert router.get("/users/1", "BASE")[0].name == "users"
+    assert router.get("/legacy/2/", "BASE")[0].name == "legacy"
+    assert router.get("/admin/1", "BASE")[0].name == "any"
+
+
+def test_cold_threshold():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/<b>", handler, name="hot")
+    router.add("/c/<d>", handler, name="cold")
+
+    with pytest.raises(FinalizationError, match="requires a profile"):
+        router.finalize(cold_threshold=0)
+
+    router.reset()
+    profile = RouteProfile({"a/<b:str>": 10, "c/<d:str>": 1})
+    router.finalize(profile=profile, cold_threshold=1)
+    assert not router.tree.root.children["a"].cold
+    assert router.tree.root.children["c"].cold
+    assert router.get("/c/1", "BASE")[0].name == "cold"
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 10), reason="Requires Python 3.10+"
+)
+def test_match_backend():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/<b:int>", handler, name="one")
+    router.add("/a/<b:int>/c", handler, name="two", methods=["GET"])
+    router.add("/<a>/c", handler, name="three")
+    router.finalize(backend="match")
+
+    assert "match parts:" in router.find_route_src
+    assert "num" not in router.find_route_src
+    assert router.get("/a/1", "BASE")[0].name == "one"
+    assert router.get("/a/1/c", "GET")[0].name == "two"
+    assert router.get("/a/c", "BASE")[0].name == "three"
+    with pytest.raises(NoMethod):
+        router.get("/a/1/c", "POST")
+    with pytest.raises(NotFound):
+        router.get("/a/1/c/d", "GET")
+
+
+def test_unknown_backend():
+    router = Router()
+    router.add("/<a>", lambda **kwargs: kwargs)
+    with pytest.raises(FinalizationError, match="Unknown backend"):
+        router.finalize(backend="unknown")
+
+
+def test_radix_backend():
+    def handler(**kwargs):
+        return kwargs
+
+    deep = "/".join(f"s{i}" for i in range(300))
+    router = Router()
+    router.add("/a/<b:int>", handler, name="one")
+    router.add("/a/<b:int>/c", handler, name="two", methods=["GET"])
+    router.add("/a/<b:int>/c", handler, name="three", methods=["PUT"])
+    router.add("/<a>/c", handler, name="four")
+    router.add(f"/{deep}/<x:int>", handler, name="five")
+    router.finalize(backend="radix")
+
+    assert router.find_route_src == ""
+    assert router.get("/a/1", "BASE")[0].name == "one"
+    assert router.get("/a/1/c", "GET")[0].name == "two"
+    assert router.get("/a/1/c", "PUT")[0].name == "three"
+    assert router.get("/a/c", "BASE")[0].name == "four"
+    route, _, params = router.get(f"/{deep}/9", "BASE")
+    assert route.name == "five"
+    assert params == {"x": 9}
+    with pytest.raises(NoMethod):
+        router.get("/a/1/c", "POST")
+    with pytest.raises(NotFound):
+        router.get(f"/{deep}/x", "BASE")
+
+
+def test_tiered_backend_compiles_hot_subtrees():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/<b:int>", handler, name="one")
+    router.add("/a/<b:int>/<c:[a-z]+>", handler, name="two")
+    router.add("/d/<e:int>", handler, name="three")
+    router.add("/<f>/g", handler, name="four")
+    router.finalize(backend="tiered", compile_threshold=2)
+
+    assert router.find_route_src == ""
+    assert router.get("/a/1", "BASE")[0].name == "one"
+    assert "def find_route_" not in router.find_route_src
+
+    route, _, params = router.get("/a/1/x", "BASE")
+    assert route.name == "two"
+    assert params == {"b": 1, "c": "x"}
+    assert router.find_route_src.count("def find_route_") == 1
+    assert router.get("/a/1", "BASE")[0].name == "one"
+    assert router.get("/a/g", "BASE")[0].name == "four"
+    with pytest.raises(NotFound):
+        router.get("/a/1/X", "BASE")
+
+    assert router.get("/d/1", "BASE")[0].name == "three"
+    assert router.find_route_src.count("def find_route_") == 2
+
+
+@pytest.mark.parametrize("static_strategy", BaseRouter.STATIC_STRATEGIES)
+def test_static_strategies(static_strategy):
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/b", handler, name="one")
+    router.add("/a/b/", handler, name="two", strict=True)
+    router.add("/a/<c>", handler, name="three")
+    router.finalize(static_strategy=static_strategy)
+
+    assert router.static_strategy == static_strategy
+    assert router.static_timings == {}
+    assert router.get("/a/b", "BASE")[0].name == "one"
+    assert router.get("/a/b/", "BASE")[0].name == "two"
+    assert router.get("/a/c", "BASE")[0].name == "three"
+    with pytest.raises(NotFound):
+        router.get("/a", "BASE")
+
+
+@pytest.mark.parametrize("traffic", (None, ["/a/b", "/a/c", "/a/b/c/d"]))
+def test_static_strategy_auto(traffic):
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/b", handler, name="one")
+    router.add("/a/<c>", handler, name="two")
+    router.finalize(static_strategy="auto", traffic=traffic)
+
+    timings = router.static_timings
+    assert set(timings) == set(BaseRouter.STATIC_STRATEGIES)
+    assert router.static_strategy == min(timings, key=timings.__getitem__)
+    assert router.get("/a/b", "BASE")[0].name == "one"
+    assert router.get("/a/c", "BASE")[0].name == "two"
+
+
+def test_static_strategy_auto_sample():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router(delimiter=":")
+    router.add(":a:b", handler, name="one")
+    router.add(":a:<c>", handler, name="two")
+    router.finalize(static_strategy="auto")
+
+    assert sorted(router._static_sample()) == [":a:_", ":a:b"]
+    assert router.get(":a:b", "BASE")[0].name == "one"
+    assert router.get(":a:c", "BASE")[0].name == "two"
+
+
+@pytest.mark.parametrize("backend", ("radix", "tiered"))
+def test_static_strategy_auto_is_not_tuned_without_source(backend):
+    router = Router()
+    router.add("/a/b", lambda **kwargs: kwargs, name="one")
+    router.finalize(static_strategy="auto", backend=backend)
+
+    assert router.static_timings == {}
+    assert router.static_strategy == "try"
+    assert router.static_paths == {}
+    assert router.get("/a/b", "BASE")[0].name == "one"
+
+
+def test_unknown_static_strategy():
+    router = Router()
+    router.add("/a", lambda **kwargs: kwargs)
+    with pytest.raises(FinalizationError, match="Unknown static strategy"):
+        router.finalize(static_strategy="unknown")
+
+
+@pytest.mark.parametrize(
+    "backend,phases",
+    (
+        ("tree", ("render", "compile", "exec")),
+        ("radix", ("render",)),
+    ),
+)
+def test_finalize_report(backend, phases):
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a/<b:int>", handler)
+    router.add("/a/<b:int>/c/<d:[a-z]+>", handler)
+    router.add("/<a>/c", handler)
+    router.add("/d", handler)
+    router.finalize()
+    assert router.finalize_report is None
+
+    router.reset()
+    router.finalize(backend=backend, report=True)
+    report = router.finalize_report
+    assert tuple(report.phases) == (
+        "groups",
+        "routes",
+        "tree",
+        "sort",
+        "static",
+        *phases,
+    )
+    assert report.total == sum(
+        phase["seconds"] for phase in report.as_dict()["phases"].values()
+    )
+    assert report.stats["nodes"] == 6
+    assert report.stats["depth"] == 4
+    assert report.stats["fan_out"] == 2
+    if backend == "tree":
+        assert report.stats["lines"] == router.find_route_src.count("\n")
+        assert report.stats["bytecode"] > 0
+    assert "render" in str(report)
@@ -1,10 +1,18 @@
+import asyncio
+import json
 import uuid
 from datetime import date
 
 import pytest
 
-from sanic_routing import BaseRouter
-from sanic_routing.exceptions import NoMethod, NotFound, RouteExists
+from sanic_routing import BaseRouter, RouteGroup, RouteProfile
+from sanic_routing.exceptions import (
+    FinalizationError,
+    InvalidUsage,
+    NoMethod,
+    NotFound,
+    RouteExists,
+)
 
 
 @pytest.fixture
@@ -314,6 +322,33 @@ def test_route_correct_coercion():
     assert h4 is handler4
 
 
+def test_unhashable_requirements():
+    def handler1():
+        return "handler1"
+
+    def handler2():
+        return "handler2"
+
+    router = Router()
+    router.add("/test", handler1, requirements={"hosts": ["a", "b"]})
+    router.add("/test", handler2, requirements={"hosts": ["c"]})
+    router.add("/test", handler2, requirements={"host": "c"})
+    with pytest.raises(RouteExists):
+        router.add("/test", handler2, requirements={"hosts": ["a", "b"]})
+    with pytest.raises(RouteExists):
+        router.add("/test", handler2)
+    router.add(
+        "/test", handler2, requirements={"hosts": ["a", "b"]}, overwrite=True
+    )
+    router.finalize()
+
+    assert len(router.routes) == 3
+    _, handler, _ = router.get("/test", "BASE", extra={"hosts": ["a", "b"]})
+    assert handler() == "handler2"
+    _, handler, _ = router.get("/test", "BASE", extra={"hosts": ["c"]})
+    assert handler() == "handler2"
+
+
 def test_non_strict_bail_out():
     def handler1():
         return "handler1"
@@ -488,6 +523,24 @@ def test_identical_path_routes_with_different_methods_complex(uri):
     assert params == {"version": 3, "foo": uri}
 
 
+@pytest.mark.parametrize("backend", ("tree", "radix", "tiered"))
+def test_path_route_params(backend):
+    def handler():
+        return "handler"
+
+    # Routes that are matched against the whole path return their params as
+    # they were captured, with every backend
+    router = Router()
+    router.add("/api/<version:int>/<foo:path>", handler, methods=["GET"])
+    router.add("/files/<foo:path>/<name=int:ext=css|js>", handler)
+    router.finalize(backend=backend)
+
+    _, handler, params = router.get("/api/3/a/random/path", "GET")
+    assert params == {"version": "3", "foo": "a/random/path"}
+    _, _, params = router.get("/files/a/random/path/123.css", "BASE")
+    assert params == {"foo": "a/random/path", "name": "123.css"}
+
+
 @pytest.mark.parametrize("uri", ("a-random-path", "a/random/path"))
 def test_identical_path_routes_with_different_methods_similar_urls(uri):
     def handler1():
@@ -523,3 +576,442 @@ def test_identical_path_routes_with_different_methods_similar_urls(uri):
     _, handler, params = router.get(f"/constant/{uri}/tracker/events", "POST")
     assert params == {"foo": f"{uri}"}
     assert handler() == "handler3"
+
+
+def test_inline_regex_matches_on_segment():
+    def handler1():
+        return "handler1"
+
+    def handler2():
+        return "handler2"
+
+    router = Router()
+    router.add("/code/<code:[A-Z]{3}>", handler1)
+    router.add("/code/<code:[a-z]{3}>", handler2)
+    router.finalize()
+
+    assert ".match(path)" not in router.find_route_src
+    assert ".match(parts[1])" in router.find_route_src
+
+    _, handler, params = router.get("/code/ABC", "BASE")
+    assert handler() == "handler1"
+    assert params == {"code": "ABC"}
+
+    _, handler, params = router.get("/code/abc", "BASE")
+    assert handler() == "handler2"
+    assert params == {"code": "abc"}
+
+    with pytest.raises(NotFound):
+        router.get("/code/AbC", "BASE")
+
+
+def test_inline_regex_sibling_short_circuit():
+    def handler1():
+        return "handler1"
+
+    def handler2():
+        return "handler2"
+
+    router = Router()
+    router.add("/<code:[A-Z]{3}>/item", handler1)
+    router.add("/<code:[0-9]{3}>/item", handler2)
+    router.finalize()
+
+    _, handler, params = router.get("/123/item", "BASE")
+    assert handler() == "handler2"
+    assert params == {"code": "123"}
+
+
+def test_inline_regex_alternation_is_anchored():
+    router = Router()
+    router.add("/<size:sm|lg>/<ident>", lambda **kwargs: ...)
+    router.finalize()
+
+    _, __, params = router.get("/lg/foo", "BASE")
+    assert params == {"size": "lg", "ident": "foo"}
+
+    with pytest.raises(NotFound):
+        router.get("/smx/foo", "BASE")
+    with pytest.raises(NotFound):
+        router.get("/xlg/foo", "BASE")
+
+
+def test_warmup():
+    def handler(**kwargs):
+        return kwargs
+
+    router = Router()
+    router.add("/a", handler)
+    router.add("/a/<b:int>", handler, methods=["GET", "POST"])
+    router.add("/u/<u:uuid>/<d:ymd>", handler)
+    router.add("/f/<name=int:ext=png|jpg>", handler)
+    router.add("/l/<lang:en|fr>", handler)
+    router.add("/p/<rest:path>", handler)
+    router.add("/r/<code:[A-Z]{3}>", handler)
+    router.add("/h", handler, requirements={"host": "example.com"})
+
+    with pytest.raises(FinalizationError):
+        router.warmup()
+
+    router.finalize(backend="tiered", compile_threshold=3)
+    router.profile = RouteProfile()
+    paths = router.warmup(iterations=4)
+
+    assert paths == [
+        "/a",
+        "/a/1",
+        "/u/00000000-0000-4000-8000-000000000000/2000-01-01",
+        "/f/1.png",
+        "/l/en",
+        "/h",
+        "/p/a/b",
+    ]
+    assert not router.profile
+    # Only the regex route could not be warmed up
+    assert [
+        tier.node.part
+        for tier in router.find_route.__self__.tiers
+        if not tier.compiled
+    ] == ["r"]
+
+
+def test_warmup_uses_registered_samples():
+    def hexadecimal(value):
+        return int(value, 16)
+
+    def octal(value):
+        return int(value, 8)
+
+    router = Router()
+    router.register_pattern("hex", hexadecimal, r"^[0-9a-f]+$")
+    router.register_pattern("oct", octal, r"^[0-7]+$", sample="17")
+    router.add("/x/<value:hex>", lambda **kwargs: ...)
+    router.add("/o/<value:oct>", lambda **kwargs: ...)
+    router.finalize()
+
+    assert router.warmup(iterations=1) == ["/o/17"]
+
+
+def test_add_many():
+    def handler(**kwargs):
+        return kwargs
+
+    specs = [
+        {"path": "/a", "handler": handler, "methods": ["GET"]},
+        {"path": "/a", "handler": handler, "methods": ["POST"]},
+        {"path": "/a/<b:int>", "handler": handler, "name": "b"},
+        {
+            "path": "/h",
+            "handler": handler,
+            "requirements": {"host": "example.com"},
+        },
+        {"path": "/c/<d:[a-z]+>", "handler": handler, "strict": True},
+    ]
+    expected = Router()
+    for spec in specs:
+        expected.add(**spec)
+
+    router = Router()
+    routes = router.add_many(specs)
+
+    assert [route.path for route in routes] == [
+        "a",
+        "a",
+        "a/<b:int>",
+        "h",
+        "c/<d:[a-z]+>",
+    ]
+    assert router.name_index == {"b": routes[2]}
+    for pool in ("static_routes", "dynamic_routes", "regex_routes"):
+        groups = getattr(router, pool)
+        assert list(groups) == list(getattr(expected, pool))
+        for segments, group in groups.items():
+            assert group.methods_index == (
+                getattr(expected, pool)[segments].methods_index
+            )
+
+    router.finalize()
+    assert router.get("/a", "POST")[0] is routes[1]
+    assert router.get("/a/1", "BASE")[2] == {"b": 1}
+    assert router.get("/c/d", "BASE")[0] is routes[4]
+
+    with pytest.raises(RouteExists):
+        Router().add_many(specs[:1] * 2)
+
+
+def test_add_manifest(tmp_path):
+    def handler(**kwargs):
+        return kwargs
+
+    filename = tmp_path / "routes.json"
+    filename.write_text(
+        json.dumps(
+            {
+                "routes": [
+                    {"path": "/a", "handler": "a", "methods": ["GET"]},
+                    {"path": "/b/<c:int>", "handler": "a", "name": "c"},
+                ]
+            }
+        )
+    )
+    router = Router()
+    routes = router.add_manifest(filename, {"a": handler})
+    assert [route.handler for route in routes] == [handler, handler]
+    router.finalize()
+    assert router.get("/b/1", "BASE")[0].name == "c"
+
+    filename.write_text(json.dumps([{"path": "/a", "handler": "x"}]))
+    with pytest.raises(InvalidUsage, match="Unknown handler"):
+        Router().add_manifest(filename, {"a": handler})
+
+
+def test_append_many_routes_to_one_group():
+    router = Router()
+    for idx in range(300):
+        router.add(
+            "/signal/<event>",
+            lambda **kwargs: ...,
+            name=f"handler{idx}",
+            append=True,
+            priority=idx % 3,
+        )
+
+    group = router.dynamic_routes[("signal", "<__dynamic__:str>")]
+    # Higher priorities first, and the latest route first for the same
+    # priority, which is how merging the groups has always ordered them
+    expected = sorted(
+        (f"handler{idx}" for idx in reversed(range(300))),
+        key=lambda name: int(name[7:]) % 3,
+        reverse=True,
+    )
+    assert [route.name for route in group] == expected
+    assert group.methods_index["BASE"].name == "handler0"
+
+
+def test_add_route_conflicts():
+    router = Router()
+    first = router.add("/a/<b>", lambda **kwargs: ..., methods=["GET"])
+    router.add("/a/<b>", lambda **kwargs: ..., methods=["POST"])
+    group = router.dynamic_routes[("a", "<__dynamic__:str>")]
+
+    with pytest.raises(RouteExists):
+        router.add("/a/<b>", lambda **kwargs: ..., methods=["PUT", "GET"])
+    with pytest.raises(RouteExists):
+        router.add(
+            "/a/<b>",
+            lambda **kwargs: ...,
+            methods=["PUT"],
+            requirements={"host": "example.com"},
+        )
+
+    route = router.add(
+        "/a/<b>", lambda **kwargs: ..., methods=["GET"], overwrite=True
+    )
+    assert router.dynamic_routes[("a", "<__dynamic__:str>")] is group
+    assert all(existing is not first for existing in group)
+    assert group.methods_index["GET"] is route
+
+
+def test_add_and_remove_after_finalize(handler, monkeypatch):
+    router = Router()
+    router.add("/a/<x:int>", handler, name="a")
+    router.add("/b/<x:int>/c", handler, name="b")
+    router.add("/<lang:en|fr>/<x:int>", handler, name="lang")
+    router.add("/static", handler, name="static")
+    router.finalize(split_size=1)
+
+    rebuilt = []
+    rebuild = router._rebuild_subtrees
+    monkeypatch.setattr(
+        router,
+        "finalize",
+        lambda **kwargs: pytest.fail("Should not finalize again"),
+    )
+    monkeypatch.setattr(
+        router,
+        "_rebuild_subtrees",
+        lambda pending: rebuilt.append(set(pending)) or rebuild(pending),
+    )
+
+    router.add("/b/<x:int>/d", handler, name="b2")
+    router.add("/c/<y:[a-z]+>", handler, name="c")
+    router.add("/other", handler, name="other")
+    router.remove("a")
+
+    assert router.get("/b/1/d", "BASE")[0].name == "b2"
+    assert router.get("/c/xyz", "BASE")[0].name == "c"
+    assert router.get("/other", "BASE")[0].name == "other"
+    assert router.get("/b/1/c", "BASE")[0].name == "b"
+    assert router.get("/en/1", "BASE")[0].name == "lang"
+    with pytest.raises(NotFound):
+        router.get("/a/1", "BASE")
+
+    # The changes are applied together, and only to their own subtrees
+    assert rebuilt == [{"a", "b", "c"}]
+    assert "a" not in router.name_index
+
+    router.remove(router.name_index["c"])
+    router.refresh()
+    with pytest.raises(NotFound):
+        router.get("/c/xyz", "BASE")
+    assert len(rebuilt) == 2
+
+
+def test_changes_are_not_seen_before_refresh(handler):
+    router = Router()
+    router.add("/a/<x:int>", handler, name="a")
+    router.add("/b/<x:int>", handler, name="b", methods=["GET"])
+    router.add("/b/<x:int>", handler, name="b2", methods=["POST"])
+    router.add("/c/<rest:path>", handler, name="rest")
+    router.add("/static", handler, name="static")
+    router.finalize(split_size=1)
+
+    # A resolve() that is already running holds on to the routing that was
+    # published before the routes changed
+    find_route, published = router._routing
+
+    def lookup(path, method="BASE"):
+        basket = {"__params__": {}, "__matches__": {}}
+        found, _ = find_route(path, method, published, basket, None)
+        if isinstance(found, RouteGroup):
+            found = found[0]
+        return found.name
+
+    router.remove("a")
+    router.remove("b2")
+    router.remove("rest")
+    router.remove("static")
+    router.add("/b/<x:int>", handler, name="b3", methods=["PUT"])
+
+    assert lookup("/a/1") == "a"
+    assert lookup("/c/x/y") == "rest"
+    assert lookup("/static") == "static"
+    group = published.dynamic_routes[("b", "<__dynamic__:int>")]
+    assert {route.name for route in group} == {"b", "b2"}
+
+    router.refresh()
+    for path in ("/a/1", "/c/x/y", "/static"):
+        with pytest.raises(NotFound):
+            router.get(path, "BASE")
+    assert router.get("/b/1", "GET")[0].name == "b"
+    assert router.get("/b/1", "PUT")[0].name == "b3"
+    with pytest.raises(NoMethod):
+        router.get("/b/1", "POST")
+
+
+def test_add_after_finalize_without_dispatch(handler):
+    router = Router()
+    router.add("/a/<x:int>", handler, name="a")
+    router.finalize()
+
+    router.add("/a/<x:int>/<rest:path>", handler, name="rest")
+    router.add("/b", handler, name="b")
+
+    assert router.get("/a/1", "BASE")[0].name == "a"
+    assert router.get("/a/1/x/y", "BASE")[0].name == "rest"
+    assert router.get("/b", "BASE")[0].name == "b"
+
+
+def test_remove_unknown_route(handler):
+    router = Router()
+    route = router.add("/a", handler, name="a")
+    router.remove(route)
+
+    with pytest.raises(InvalidUsage):
+        router.remove("a")
+    with pytest.raises(InvalidUsage):
+        router.remove(route)
+
+
+def test_rebuild_swaps_in_new_routes(handler):
+    router = Router()
+    router.add("/a/<x:int>", handler, name="a")
+    router.finalize(split_size=1)
+
+    def populate(new):
+        # The old routes are still resolved while the new ones are built
+        assert router.get("/a/1", "BASE")[0].name == "a"
+        new.add("/b/<x:int>", handler, name="b")
+
+    new = router.build(populate)
+    assert new.finalized
+    assert new.tree.split_size == 1
+    assert router.get("/a/1", "BASE")[0].name == "a"
+
+    router.swap(new)
+    assert router.get("/b/1", "BASE")[0].name == "b"
+    assert list(router.name_index) == ["b"]
+    with pytest.raises(NotFound):
+        router.get("/a/1", "BASE")
+
+    # Routes can still be added to it afterwards
+    router.add("/c/<x:int>", handler, name="c")
+    assert router.get("/c/1", "BASE")[0].name == "c"
+
+
+def test_rebuild_async(handler):
+    router = Router()
+    router.add("/a", handler, name="a")
+    router.finalize()
+
+    def populate(new):
+        new.add("/b", handler, name="b")
+
+    asyncio.run(router.rebuild_async(populate))
+    assert router.get("/b", "BASE")[0].name == "b"
+    with pytest.raises(NotFound):
+        router.get("/a", "BASE")
+
+
+def test_swap_requires_finalized_router(handler):
+    router = Router()
+    router.add("/a", handler)
+    router.finalize()
+
+    other = Router()
+    other.add("/b", handler)
+    with pytest.raises(FinalizationError):
+        router.swap(other)
+
+
+def test_build_in_process(handler):
+    def other(**kwargs):
+        return "other"
+
+    router = Router()
+    router.add("/a", handler)
+    router.finalize()
+
+    routes = [
+        {"path": "/a/<x:int>", "handler": "main", "name": "a"},
+        {"path": "/b/<code:[A-Z]{3}>", "handler": "other", "name": "b"},
+        {"path": "/c/<rest:path>", "handler": "other", "name": "c"},
+        {"path": "/static", "handler": "main", "name": "static"},
+    ]
+    new = router.build_in_process(
+        routes, {"main": handler, "other": other}, split_size=1
+    )
+    router.swap(new)
+
+    route, found, params = router.get("/a/1", "BASE")
+    assert (route.name, found, params) == ("a", handler, {"x": 1})
+    route, found, params = router.get("/b/XYZ", "BASE")
+    assert (route.name, found, params) == ("b", other, {"code": "XYZ"})
+    assert router.get("/c/d/e", "BASE")[2] == {"rest": "d/e"}
+    assert router.get("/static", "BASE")[0].name == "static"
+    assert router.find_route_src.startswith("def find_route(")
+
+    # Changing the routes finalizes it again
+    router.add("/d/<x:int>", handler, name="d")
+    assert router.get("/d/1", "BASE")[0].name == "d"
+    assert router.get("/b/XYZ", "BASE")[0].name == "b"
+
+
+def test_build_in_process_errors(handler):
+    router = Router()
+    with pytest.raises(InvalidUsage):
+        router.build_in_process([{"path": "/a", "handler": "x"}], {})
+    with pytest.raises(FinalizationError):
+        router.build_in_process(
+            [{"path": "/a", "handler": "x"}], {"x": handler}, backend="radix"
+        )
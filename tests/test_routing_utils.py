@@ -1,6 +1,8 @@
+import re
+
 import pytest
 
-from sanic_routing.utils import path_to_parts
+from sanic_routing.utils import path_to_parts, split_path
 
 
 @pytest.mark.parametrize(
@@ -126,3 +128,24 @@ def test_path_to_parts_splitter_dot_delimiter(parts):
 )
 def test_path_to_parts_splitter_normalization(path, parts):
     assert path_to_parts(path) == parts, path
+
+
+@pytest.mark.parametrize("delimiter", ("/", "."))
+@pytest.mark.parametrize(
+    "path",
+    (
+        "",
+        "a/b.c",
+        "a/<b:[a-z/.]+>/c",
+        r"a/<b:x(?P<y>z/)>/<c>",
+        "a<b/c>d/e",
+        "a>/b</c",
+        "?</a/>.b",
+        "<a:(?<!x)/y>/<b:(?<=x).z>",
+        "//..<<>>//",
+    ),
+)
+def test_split_path_matches_regex_split(path, delimiter):
+    escaped = re.escape(delimiter)
+    expected = re.split(rf"{escaped}(?=[^>]*(?:<(?<!\?<)|$))", path)
+    assert split_path(path, delimiter) == expected
@@ -50,3 +50,36 @@ def test_unquote_non_string():
 
     _, handler, params = router.get("/😎/123", "GET")
     assert params == {"bar": 123, "foo": "😎"}
+
+
+def test_unquote_unhashable_cast():
+    class Upper:
+        __name__ = "upper"
+        __annotations__ = {"return": str}
+
+        def __eq__(self, other):
+            return isinstance(other, Upper)
+
+        def __call__(self, value: str) -> str:
+            return value.upper()
+
+    handler = Mock(return_value=123)
+
+    router = Router()
+    router.register_pattern("upper", Upper(), r"^[^/]+$")
+    router.add(
+        "/<foo:upper>/<bar:int>",
+        methods=["GET"],
+        handler=handler,
+        unquote=True,
+    )
+    router.finalize()
+
+    _, handler, params = router.get("/%C3%A9t%C3%A9/123", "GET")
+    # The segment is cast before it is unquoted
+    assert params == {"bar": 123, "foo": "éTé"}
+    assert router.tree.cast_as_str(int) is False
+    assert router.tree._str_casts == {int: False}
+
+    router.reset()
+    assert router.tree._str_casts == {}